@@ -0,0 +1,99 @@
+import threading
+import pygame
+
+from constants import *
+
+class AudioManager:
+    # Music tracks are decoded once into Sounds and looped on their own reserved channels,
+    # so switching between map and battle music is a volume crossfade instead of a
+    # stop/load/play of the MP3. A track faded out is paused and resumes where it left off.
+    # All decoding happens on a background thread started by start_loading; anything
+    # requested before its file is ready is skipped (effects) or starts once loaded (music).
+    def __init__(self, music_paths, sound_paths, crossfade_ms=AUDIO_CROSSFADE_MS):
+        self.music_paths = music_paths  # track name -> file
+        self.sound_paths = sound_paths  # effect name -> file
+        self.crossfade_ms = crossfade_ms
+        self.tracks = {}  # track name -> Sound, filled by the loader thread
+        self.sounds = {}  # effect name -> Sound, filled by the loader thread
+        self.streamed = set()  # tracks that could not be decoded and play through mixer.music
+        self.channels = {}
+        self.volumes = {name: 0.0 for name in music_paths}
+        self.current = None
+        self.loader = None
+
+        pygame.mixer.set_reserved(len(music_paths))
+        for index, name in enumerate(music_paths):
+            self.channels[name] = pygame.mixer.Channel(index)
+
+    def start_loading(self):
+        self.loader = threading.Thread(target=self.load_all, name="audio-loader", daemon=True)
+        self.loader.start()
+
+    def load_all(self):
+        # Starting music first, then the rest of the music, then the short effects
+        order = sorted(self.music_paths, key=lambda name: name != self.current)
+        for name in order:
+            try:
+                self.tracks[name] = pygame.mixer.Sound(self.music_paths[name])
+            except pygame.error:
+                self.streamed.add(name)  # SDL_mixer built without MP3 decoding for Sounds
+        for name, path in self.sound_paths.items():
+            self.sounds[name] = pygame.mixer.Sound(path)
+
+    def play_sound(self, name):
+        sound = self.sounds.get(name)
+        if sound is not None:
+            sound.play()
+
+    def play_music(self, name, restart=False): # Crossfade to a track, restart plays it from the beginning
+        if name == self.current and not restart:
+            return
+        self.current = name
+        pygame.mixer.music.stop()  # Only ever playing a streamed fallback track
+
+        if restart and name in self.channels:
+            self.channels[name].stop()
+            self.volumes[name] = 0.0
+        self.start_track(name)
+
+    def start_track(self, name):
+        if name in self.streamed:
+            pygame.mixer.music.load(self.music_paths[name])
+            pygame.mixer.music.set_volume(MUSIC_VOLUMES.get(name, 1.0))
+            pygame.mixer.music.play(-1)
+            return
+
+        sound = self.tracks.get(name)
+        if sound is None:
+            return  # Still decoding, update() starts it once it is ready
+        channel = self.channels[name]
+        if channel.get_sound() is sound:
+            channel.unpause()
+        else:
+            channel.set_volume(self.volumes[name])
+            channel.play(sound, loops=-1)
+
+    def update(self, elapsed_ms): # Advance crossfades, call once per frame with the frame time
+        # Current track finished decoding after it was requested
+        current = self.current
+        if current in self.tracks and not self.channels[current].get_busy():
+            self.start_track(current)
+        elif current in self.streamed and not pygame.mixer.music.get_busy():
+            self.start_track(current)
+
+        step = elapsed_ms / self.crossfade_ms if self.crossfade_ms > 0 else 1.0
+        for name, channel in self.channels.items():
+            if name not in self.tracks:
+                continue
+            target = MUSIC_VOLUMES.get(name, 1.0) if name == self.current else 0.0
+            volume = self.volumes[name]
+            if volume == target:
+                continue
+            if volume < target:
+                volume = min(target, volume + step)
+            else:
+                volume = max(target, volume - step)
+            self.volumes[name] = volume
+            channel.set_volume(volume)
+            if volume == 0.0:
+                channel.pause()  # Keeps the position for the next time this track comes back
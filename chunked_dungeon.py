@@ -0,0 +1,208 @@
+import random
+import zlib
+from collections import OrderedDict
+
+from constants import *
+
+WALL_VALUE = CellType.WALL.value
+EMPTY_VALUE = CellType.EMPTY.value
+CELL_BY_VALUE = {cell.value: cell for cell in CellType}
+
+class ChunkRow: # Row view so dungeon_map[y][x] keeps working on a chunked map
+    def __init__(self, dungeon, y):
+        self.dungeon = dungeon
+        self.y = y
+
+    def __len__(self):
+        return self.dungeon.width
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.dungeon.width:
+            raise IndexError(x)
+        return self.dungeon.get_cell(x, self.y)
+
+    def __setitem__(self, x, cell):
+        if not 0 <= x < self.dungeon.width:
+            raise IndexError(x)
+        self.dungeon.set_cell(x, self.y, cell)
+
+class ChunkedDungeon:
+    # Endless dungeon split into CHUNK_SIZE x CHUNK_SIZE tiles. Chunks are generated
+    # deterministically from (seed, cx, cy) when first touched and kept in an LRU of
+    # at most max_loaded_chunks. Untouched chunks are simply dropped on eviction since
+    # they can be regenerated, modified ones (treasure picked up) are kept zlib-packed.
+    def __init__(self, seed, difficulty, chunk_size=CHUNK_SIZE, max_loaded_chunks=MAX_LOADED_CHUNKS,
+                 world_chunks=ENDLESS_WORLD_CHUNKS):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.chunk_size = chunk_size
+        self.max_loaded_chunks = max_loaded_chunks
+        self.world_chunks = world_chunks
+        self.width = world_chunks * chunk_size
+        self.height = world_chunks * chunk_size
+
+        self.loaded = OrderedDict()  # (cx, cy) -> bytearray, most recently used last
+        self.dirty = set()
+        self.compressed = {}
+        self.chunks_generated = 0
+        self.spawned_enemies = {}  # spawn cell -> Enemy, for enemies currently simulated
+        self.killed_spawns = set()  # Spawn cells whose enemy was killed, they stay empty
+
+        self.start_chunk = (world_chunks // 2, world_chunks // 2)
+        self.exit_chunk = (min(world_chunks - 1, self.start_chunk[0] + ENDLESS_EXIT_DISTANCE), self.start_chunk[1])
+
+        # Most cell lookups hit the same chunk as the previous one, skip the LRU bookkeeping for those
+        self._last_key = None
+        self._last_chunk = None
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError(y)
+        return ChunkRow(self, y)
+
+    @property
+    def start_position(self):
+        cx, cy = self.start_chunk
+        room_x, room_y, room_width, room_height = self.chunk_room(cx, cy)
+        return (cx * self.chunk_size + room_x + room_width // 2,
+                cy * self.chunk_size + room_y + room_height // 2)
+
+    def chunk_key(self, x, y):
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def get_cell(self, x, y):
+        size = self.chunk_size
+        chunk = self.get_chunk(x // size, y // size)
+        return CELL_BY_VALUE[chunk[(y % size) * size + x % size]]
+
+    def set_cell(self, x, y, cell):
+        size = self.chunk_size
+        key = (x // size, y // size)
+        chunk = self.get_chunk(*key)
+        chunk[(y % size) * size + x % size] = cell.value
+        self.dirty.add(key)
+
+    def get_chunk(self, cx, cy):
+        key = (cx, cy)
+        if key == self._last_key:
+            return self._last_chunk
+
+        chunk = self.loaded.get(key)
+        if chunk is None:
+            chunk = self.load_chunk(key)
+        else:
+            self.loaded.move_to_end(key)
+
+        self._last_key = key
+        self._last_chunk = chunk
+        return chunk
+
+    def load_chunk(self, key):
+        packed = self.compressed.pop(key, None)
+        if packed is not None:
+            chunk = bytearray(zlib.decompress(packed))
+            self.dirty.add(key)
+        else:
+            chunk = self.generate_chunk(*key)
+
+        self.loaded[key] = chunk
+        while len(self.loaded) > self.max_loaded_chunks:
+            self.evict_oldest()
+        return chunk
+
+    def evict_oldest(self):
+        key, chunk = self.loaded.popitem(last=False)
+        if key in self.dirty:
+            self.dirty.discard(key)
+            self.compressed[key] = zlib.compress(bytes(chunk))
+        if key == self._last_key:
+            self._last_key = None
+            self._last_chunk = None
+
+    def ensure_loaded_around(self, x, y, radius=1): # Generate neighbouring chunks ahead of the player
+        cx, cy = self.chunk_key(x, y)
+        for ny in range(max(0, cy - radius), min(self.world_chunks, cy + radius + 1)):
+            for nx in range(max(0, cx - radius), min(self.world_chunks, cx + radius + 1)):
+                self.get_chunk(nx, ny)
+
+    def chunk_rng(self, cx, cy, salt=""):
+        return random.Random(f"{self.seed}:{cx}:{cy}{salt}")
+
+    def chunk_room(self, cx, cy): # Room rectangle in chunk-local coordinates
+        rng = self.chunk_rng(cx, cy)
+        size = self.chunk_size
+        room_width = rng.randint(4, size - 4)
+        room_height = rng.randint(4, size - 4)
+        room_x = rng.randint(1, size - room_width - 1)
+        room_y = rng.randint(1, size - room_height - 1)
+        return room_x, room_y, room_width, room_height
+
+    def generate_chunk(self, cx, cy):
+        size = self.chunk_size
+        cells = bytearray([WALL_VALUE]) * (size * size)
+        room_x, room_y, room_width, room_height = self.chunk_room(cx, cy)
+
+        for y in range(room_y, room_y + room_height):
+            for x in range(room_x, room_x + room_width):
+                cells[y * size + x] = EMPTY_VALUE
+
+        # Every chunk has a door in the middle of each edge so neighbours always line up
+        center_x = room_x + room_width // 2
+        center_y = room_y + room_height // 2
+        mid = size // 2
+        doors = []
+        if cx > 0:
+            doors.append((0, mid, True))
+        if cx < self.world_chunks - 1:
+            doors.append((size - 1, mid, True))
+        if cy > 0:
+            doors.append((mid, 0, False))
+        if cy < self.world_chunks - 1:
+            doors.append((mid, size - 1, False))
+
+        for door_x, door_y, side_door in doors:
+            if side_door:
+                # Vertical leg inside the chunk, then straight out to the side edge
+                for y in range(min(center_y, door_y), max(center_y, door_y) + 1):
+                    cells[y * size + center_x] = EMPTY_VALUE
+                for x in range(min(center_x, door_x), max(center_x, door_x) + 1):
+                    cells[door_y * size + x] = EMPTY_VALUE
+            else:
+                for x in range(min(center_x, door_x), max(center_x, door_x) + 1):
+                    cells[center_y * size + x] = EMPTY_VALUE
+                for y in range(min(center_y, door_y), max(center_y, door_y) + 1):
+                    cells[y * size + door_x] = EMPTY_VALUE
+
+        rng = self.chunk_rng(cx, cy, ":treasure")
+        if (cx, cy) == self.exit_chunk:
+            cells[center_y * size + center_x] = CellType.EXIT.value
+        elif (cx, cy) != self.start_chunk and rng.random() < 0.3 + 0.1 * self.difficulty:
+            x = rng.randint(room_x + 1, room_x + room_width - 2)
+            y = rng.randint(room_y + 1, room_y + room_height - 2)
+            cells[y * size + x] = CellType.TREASURE.value
+
+        self.chunks_generated += 1
+        return cells
+
+    def record_kills(self): # Move dead spawned enemies into killed_spawns
+        for cell, enemy in list(self.spawned_enemies.items()):
+            if not enemy.alive:
+                self.killed_spawns.add(cell)
+                del self.spawned_enemies[cell]
+
+    def chunk_spawns(self, cx, cy): # Deterministic enemy spawn cells (world coordinates) for a chunk
+        if (cx, cy) == self.start_chunk:
+            return []
+
+        rng = self.chunk_rng(cx, cy, ":spawns")
+        room_x, room_y, room_width, room_height = self.chunk_room(cx, cy)
+        spawns = []
+        for _ in range(rng.randint(0, 1 + self.difficulty // 2)):
+            x = cx * self.chunk_size + rng.randint(room_x, room_x + room_width - 1)
+            y = cy * self.chunk_size + rng.randint(room_y, room_y + room_height - 1)
+            if self.get_cell(x, y) == CellType.EMPTY and (x, y) not in spawns:
+                spawns.append((x, y))
+        return spawns
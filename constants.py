@@ -1,20 +1,90 @@
-import pygame
-import sys
-import random
 from enum import Enum
-from collections import defaultdict, deque
-from heapq import heappush, heappop
-import math
-import pygame.mixer
 
 # Constants
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 768
 FPS = 60
+STARTUP_BUDGET_MS = 1500  # Target time from process start to the first frame on screen
+
+# Frame loop: late latching sleeps before reading input instead of after presenting
+LATE_LATCH_MODE = False
+LATE_LATCH_MARGIN_MS = 2  # Slack left before the present deadline
+VSYNC = False
+LATENCY_SAMPLES = 600  # Input latency samples kept for the report
+LATENCY_REPORT_FRAMES = FPS * 10  # Print the latency report this often when measuring
+CELL_SIZE = 25  # Dungeon tile size in pixels
+HEALTH_BAR_STEPS = 32  # Cached enemy health bar frames
+
+# Dirty-rect presentation, full flip once the dirty area passes this fraction of the screen
+DIRTY_RECT_MODE = False
+DIRTY_RECT_FULL_THRESHOLD = 0.5
 
 # AI Constants
 ENEMY_DETECTION_RANGE = 8
 ENEMY_PATROL_RANGE = 3
+# Enemy pathfinding: "astar" searches from scratch per move, "dstar" keeps an incremental
+# D* Lite search per enemy, "nexthop" looks moves up in a per-map all-pairs table
+ENEMY_PATHFINDER = "astar"
+NEXTHOP_MAX_BYTES = 1 << 20  # Bigger maps keep searching with A*
+NEXTHOP_CACHE_MAPS = 4  # Most recent maps whose tables are kept
+PATH_SERVICE_WORKERS = 0  # Worker processes for enemy pathfinding, 0 keeps A* on the main thread
+
+# Combat balance
+ENEMY_COUNT_BASE = 2  # Enemies per dungeon are this plus the difficulty
+PLAYER_PROJECTILE_DAMAGE = 20
+ENEMY_PROJECTILE_DAMAGE = 20
+PROJECTILE_RANGE = SCREEN_WIDTH  # Pixels a projectile flies before it despawns
+TREASURE_HEAL = 20
+
+# Balance simulator
+SIM_BOT_ACTION_INTERVAL = 8  # Ticks between bot actions, about a key press every 130 ms
+SIM_MAX_TICKS = FPS * 300  # A bot that has not cleared the dungeon after 5 minutes loses
+
+# Headless session host
+SESSION_HOST_PORT = 7777
+SESSION_WORLD_NODES = 10  # Dungeons per session world, including start and boss
+SESSION_INPUT_QUEUE = 64  # Inputs a session buffers between ticks before dropping the oldest
+
+# World map generation, 0 keeps the classic 6-10 dungeon world
+WORLD_NODE_COUNT = 0
+LAYOUT_SWEEPS = 8  # Barycenter ordering passes for the world map layout
+MAP_NODE_SPACING = 180  # Minimum horizontal gap between map nodes in a layer
+MAP_MIN_LAYER_SPACING = 100
+MAP_MIN_ZOOM = 0.1
+MAP_MAX_ZOOM = 2.0
+MAP_NODE_RADIUS = 35  # Drawn node circle radius in world pixels, also the click radius
+MAP_LABEL_WIDTH = 160  # Name and level labels, in screen pixels at every zoom
+MAP_LABEL_HEIGHT = 25
+MAP_LABEL_GAP = 10  # Screen pixels between the node circle and its labels
+MAP_LABEL_MIN_ZOOM = 0.6  # Labels are skipped below this zoom
+MAP_GRID_CELL = 256  # Spatial index bucket size in world pixels
+MAP_PAN_STEP = 60
+
+# Chunked (endless) dungeon
+ENDLESS_MODE = False
+CHUNK_SIZE = 16
+MAX_LOADED_CHUNKS = 64
+ENDLESS_WORLD_CHUNKS = 4096  # Chunks per side, effectively unbounded
+ENDLESS_EXIT_DISTANCE = 8  # Chunks from the start chunk to the exit
+ENDLESS_ACTIVE_RADIUS = 2  # Chunks around the player that stay simulated
+
+# Audio
+AUDIO_CROSSFADE_MS = 600
+MUSIC_VOLUMES = {"map": 1.0, "battle": 0.7}
+
+# Idle dungeon maps: completed or least recently visited ones are packed with zlib once
+# the unpacked maps of dungeons not being played take more than this many bytes
+DUNGEON_MAP_BUDGET = 64 * 1024
+
+# Save games
+SAVE_DIR = "saves"
+SAVE_VERSION = 2
+REPLAY_VERSION = 1
+TELEMETRY_VERSION = 1
+
+# Telemetry
+TELEMETRY_TICKS = FPS * 60 * 5  # Ticks kept in the ring buffer, the last 5 minutes
+TELEMETRY_FILE = "telemetry.bin"  # Written on exit when F3 recorded something without --telemetry
 
 # Colors
 BLACK = (0, 0, 0)
@@ -54,6 +124,25 @@ ENEMY_ARCHER = (255, 165, 0)
 ENEMY_MAGE = (128, 0, 128)
 ENEMY_BOSS = (0, 0, 0) 
 
+# Enemy archetypes: health and damage are base + randint(0, roll), rolled per enemy
+ENEMY_STATS = {
+    # type     health, roll, damage, roll, ranged, range, color
+    "goblin": (20, 10, 15, 5, False, 1, ENEMY_GOBLIN),  # Meele
+    "orc": (40, 20, 25, 10, False, 1, ENEMY_ORC),  # Meele
+    "archer": (20, 0, 20, 10, True, 6, ENEMY_ARCHER),  # Ranged
+    "mage": (40, 0, 30, 15, True, 8, ENEMY_MAGE),  # Ranged
+    "boss": (100, 0, 40, 20, True, 10, ENEMY_BOSS),  # Ranged
+}
+
+# Enemy types that can spawn at each dungeon difficulty
+ENEMY_TYPES_BY_LEVEL = {
+    1: ["goblin"],
+    2: ["goblin", "orc"],
+    3: ["goblin", "orc", "archer"],
+    4: ["goblin", "orc", "archer", "mage"],
+    5: ["goblin", "orc", "archer", "mage", "boss"]
+}
+
 # Enemy projectile color
 ENEMY_PROJECTILE = (255, 0, 255)
 
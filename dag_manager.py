@@ -1,54 +1,254 @@
-import pygame
-import sys
-import random
-from enum import Enum
 from collections import defaultdict, deque
-from heapq import heappush, heappop
-import math
-import pygame.mixer
 
-from dungeon import DungeonNode
+from constants import *
+from dungeon import DungeonNode, map_bytes
 
 class DAGManager:
     def __init__(self):
         self.nodes = {}
         self.adjacency_list = defaultdict(list)
         self.reverse_adjacency = defaultdict(list)
+        self.unmet_dependencies = {}  # node id -> number of required nodes not completed yet
+        self.frontier = set()  # unlocked but not completed
+        self.completed_count = 0
+        self.node_index = {}  # node id -> bit position for the analytics bitsets
+        self.index_to_id = []
+        self.analytics_ready = False
+        self.visit_clock = 0  # Bumped on every dungeon entry, orders nodes for map eviction
     
     def add_node(self, node):
+        # A second node with the same id would reset its dependency counter (unlocking it
+        # early) and count its completion twice
+        if node.id in self.nodes:
+            raise ValueError(f"duplicate node id {node.id!r}")
         self.nodes[node.id] = node
+        # Edges may come before their nodes: requirements already known count unless completed,
+        # and a node added as completed releases the successors that were waiting on it
+        self.unmet_dependencies[node.id] = sum(
+            1 for from_id in self.reverse_adjacency.get(node.id, ())
+            if from_id not in self.nodes or not self.nodes[from_id].completed)
+        self.node_index[node.id] = len(self.index_to_id)
+        self.index_to_id.append(node.id)
+        if self.analytics_ready:
+            self.descendants.append(0)
+            self.ancestors.append(0)
+            self.depth.append(0)
+            self.path_difficulty.append(node.difficulty)
+            self.best_predecessor.append(None)
+        if node.completed:
+            self.completed_count += 1
+            for next_id in self.adjacency_list.get(node.id, ()):
+                if next_id in self.nodes:
+                    self.unmet_dependencies[next_id] -= 1
+                    self.refresh_node(next_id)
+        self.refresh_node(node.id)
         
     def add_edge(self, from_node_id, to_node_id):
+        if self.analytics_ready:
+            if from_node_id in self.node_index and to_node_id in self.node_index:
+                self.add_edge_to_analytics(from_node_id, to_node_id)
+            else:
+                self.analytics_ready = False  # Edge to a node that isn't added yet, rebuild on the next query
         self.adjacency_list[from_node_id].append(to_node_id)
         self.reverse_adjacency[to_node_id].append(from_node_id)
+        # A target that isn't added yet counts its requirements in add_node
+        from_node = self.nodes.get(from_node_id)
+        if to_node_id in self.nodes and (from_node is None or not from_node.completed):
+            self.unmet_dependencies[to_node_id] += 1
+            self.refresh_node(to_node_id)
+
+    def refresh_node(self, node_id): # Sync unlocked flag and frontier with the dependency counter
+        node = self.nodes[node_id]
+        node.unlocked = self.unmet_dependencies[node_id] == 0
+        if node.unlocked and not node.completed:
+            self.frontier.add(node_id)
+        else:
+            self.frontier.discard(node_id)
+
+    def complete_node(self, node_id): # O(out-degree), returns the ids this completion unlocked
+        node = self.nodes[node_id]
+        if node.completed:
+            return []
+        node.completed = True
+        self.completed_count += 1
+        self.frontier.discard(node_id)
+
+        newly_unlocked = []
+        for next_id in self.adjacency_list[node_id]:
+            self.unmet_dependencies[next_id] -= 1
+            if self.unmet_dependencies[next_id] == 0:
+                self.refresh_node(next_id)
+                newly_unlocked.append(next_id)
+        return newly_unlocked
+
+    def unlocked_frontier(self): # Nodes the player can enter right now
+        return [self.nodes[node_id] for node_id in self.frontier]
+
+    def all_completed(self):
+        return self.completed_count == len(self.nodes)
+
+    def visit(self, node_id): # Restore the node's map if it was packed and mark it most recently used
+        node = self.nodes[node_id]
+        self.visit_clock += 1
+        node.last_visit = self.visit_clock
+        node.unpack_map()
+        return node
+
+    def evict_idle_maps(self, keep_id=None, budget=DUNGEON_MAP_BUDGET):
+        # Completed dungeons are packed right away, the rest least recently visited first
+        # until the resident maps fit in budget bytes. Returns how many maps were packed.
+        resident = [node for node_id, node in self.nodes.items()
+                    if node_id != keep_id and isinstance(node.dungeon_map, list)]
+        resident.sort(key=lambda node: (not node.completed, node.last_visit))
+        used = sum(map_bytes(node.dungeon_map) for node in resident)
+        packed = 0
+        for node in resident:
+            if not node.completed and used <= budget:
+                break
+            used -= map_bytes(node.dungeon_map)
+            node.pack_map()
+            packed += 1
+        return packed
         
     def update_unlocked_nodes(self):
-        # Start node is always unlocked
-        if 'start' in self.nodes:
-            self.nodes['start'].unlocked = True
-            
-        # BFS to unlock nodes based on completed dependencies
-        queue = deque(['start'])
-        visited = set(['start'])
-        
+        # Full O(V + E) rebuild of the counters from the nodes' completed flags,
+        # only needed after flags were changed behind the manager's back
+        self.completed_count = sum(1 for node in self.nodes.values() if node.completed)
+        for node_id in self.nodes:
+            self.unmet_dependencies[node_id] = sum(
+                1 for req_id in self.reverse_adjacency[node_id] if not self.nodes[req_id].completed)
+
+        self.frontier = set()
+        for node_id in self.nodes:
+            self.refresh_node(node_id)
+
+    def topological_order(self):
+        # Kahn topological sort over the adjacency lists, O(V + E)
+        indegree = {node_id: len(self.reverse_adjacency.get(node_id, ())) for node_id in self.nodes}
+        queue = deque(node_id for node_id, degree in indegree.items() if degree == 0)
+        order = []
+
         while queue:
             current_id = queue.popleft()
-            current_node = self.nodes[current_id]
-            
-            # Check all nodes that depend on current node
-            for next_id in self.adjacency_list[current_id]:
-                if next_id not in visited:
-                    next_node = self.nodes[next_id]
-                    
-                    # Check if all required nodes are completed
-                    all_requirements_met = True
-                    for req_id in self.reverse_adjacency[next_id]:
-                        if not self.nodes[req_id].completed:
-                            all_requirements_met = False
-                            break
-                    
-                    if all_requirements_met:
-                        next_node.unlocked = True
-                        if next_node.completed:
-                            queue.append(next_id)
-                            visited.add(next_id)
+            order.append(current_id)
+            for next_id in self.adjacency_list.get(current_id, ()):
+                indegree[next_id] -= 1
+                if indegree[next_id] == 0:
+                    queue.append(next_id)
+
+        if len(order) != len(self.nodes):
+            stuck = [node_id for node_id, degree in indegree.items() if degree > 0]
+            raise ValueError(f"Dungeon graph has a cycle, {len(stuck)} nodes could not be ordered (e.g. {stuck[:5]})")
+        return order
+
+    def compute_depths(self):
+        # A node's depth is the longest dependency chain above it, so every edge points to a deeper level
+        if self.analytics_ready:
+            return {node_id: self.depth[self.node_index[node_id]] for node_id in self.nodes}
+
+        depths = {}
+        for node_id in self.topological_order():
+            depths[node_id] = max((depths[req_id] + 1 for req_id in self.reverse_adjacency.get(node_id, ())), default=0)
+        return depths
+
+    # Reachability and critical path analytics. Built lazily on the first query, then kept
+    # up to date by add_node / add_edge. Nodes get a bit index; descendants[i] / ancestors[i]
+    # are Python ints used as bitsets, so reaches() is one shift and a full descendant set
+    # costs O(n / 64) words.
+
+    def build_analytics(self):
+        order = self.topological_order()
+        count = len(self.index_to_id)
+        self.descendants = [0] * count
+        self.ancestors = [0] * count
+        self.depth = [0] * count
+        self.path_difficulty = [0] * count
+        self.best_predecessor = [None] * count
+
+        for node_id in order:
+            i = self.node_index[node_id]
+            self.path_difficulty[i] = self.nodes[node_id].difficulty
+            for req_id in self.reverse_adjacency.get(node_id, ()):
+                self.relax(self.node_index[req_id], i)
+                self.ancestors[i] |= self.ancestors[self.node_index[req_id]] | (1 << self.node_index[req_id])
+
+        for node_id in reversed(order):
+            i = self.node_index[node_id]
+            for next_id in self.adjacency_list.get(node_id, ()):
+                j = self.node_index[next_id]
+                self.descendants[i] |= self.descendants[j] | (1 << j)
+
+        self.analytics_ready = True
+
+    def ensure_analytics(self):
+        if not self.analytics_ready:
+            self.build_analytics()
+
+    def relax(self, i, j): # Edge i -> j, returns True if j's depth or hardest path improved
+        improved = False
+        if self.depth[i] + 1 > self.depth[j]:
+            self.depth[j] = self.depth[i] + 1
+            improved = True
+        difficulty = self.path_difficulty[i] + self.nodes[self.index_to_id[j]].difficulty
+        if difficulty > self.path_difficulty[j]:
+            self.path_difficulty[j] = difficulty
+            self.best_predecessor[j] = i
+            improved = True
+        return improved
+
+    def add_edge_to_analytics(self, from_node_id, to_node_id):
+        i = self.node_index[from_node_id]
+        j = self.node_index[to_node_id]
+        if i == j or (self.descendants[j] >> i) & 1:
+            raise ValueError(f"Edge {from_node_id} -> {to_node_id} would create a cycle")
+
+        # Everything above i (and i) now reaches everything below j (and j)
+        above = self.ancestors[i] | (1 << i)
+        below = self.descendants[j] | (1 << j)
+        for k in bit_indices(above):
+            self.descendants[k] |= below
+        for k in bit_indices(below):
+            self.ancestors[k] |= above
+
+        # Push the longer chains down from j only as far as they change something
+        stack = [(i, j)]
+        while stack:
+            pred, node = stack.pop()
+            if self.relax(pred, node):
+                for next_id in self.adjacency_list.get(self.index_to_id[node], ()):
+                    stack.append((node, self.node_index[next_id]))
+
+    def reaches(self, from_node_id, to_node_id): # O(1) bit test
+        self.ensure_analytics()
+        return bool((self.descendants[self.node_index[from_node_id]] >> self.node_index[to_node_id]) & 1)
+
+    def eventually_unlocks(self, node_id): # Every node that completing node_id is a prerequisite for
+        self.ensure_analytics()
+        return [self.index_to_id[k] for k in bit_indices(self.descendants[self.node_index[node_id]])]
+
+    def eventually_unlocks_count(self, node_id):
+        self.ensure_analytics()
+        return bin(self.descendants[self.node_index[node_id]]).count("1")
+
+    def node_depth(self, node_id):
+        self.ensure_analytics()
+        return self.depth[self.node_index[node_id]]
+
+    def hardest_path_difficulty(self, node_id):
+        self.ensure_analytics()
+        return self.path_difficulty[self.node_index[node_id]]
+
+    def hardest_path(self, node_id="boss"): # Chain of ids with the highest total difficulty ending at node_id
+        self.ensure_analytics()
+        path = []
+        i = self.node_index[node_id]
+        while i is not None:
+            path.append(self.index_to_id[i])
+            i = self.best_predecessor[i]
+        return path[::-1]
+
+def bit_indices(bits): # Positions of the set bits, lowest first
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
@@ -0,0 +1,56 @@
+import pygame
+
+from constants import *
+
+class DirtyRectTracker:
+    # Collects the screen areas that changed this frame and presents only those with
+    # pygame.display.update(rects). Rects from the previous frame are pushed again so
+    # whatever moved away gets erased on screen. Falls back to a full flip when the
+    # view itself changed (state switch, camera scroll) or the dirty area is large.
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, full_threshold=DIRTY_RECT_FULL_THRESHOLD):
+        self.screen_rect = pygame.Rect(0, 0, width, height)
+        self.full_threshold = full_threshold
+        self.current = []
+        self.previous = []
+        self.last_view = None
+        self.force_full = True
+        self.full_flips = 0
+        self.partial_updates = 0
+
+    def add(self, rect):
+        rect = pygame.Rect(rect).clip(self.screen_rect)
+        if rect.width and rect.height:
+            self.current.append(rect)
+
+    def add_all(self, rects):
+        for rect in rects:
+            self.add(rect)
+
+    def invalidate(self): # Frame was pushed in full elsewhere, next present starts from scratch
+        self.current = []
+        self.previous = []
+        self.force_full = True
+
+    def present(self, view=None):
+        # view identifies what the background looks like (game state, camera position),
+        # any change there means every pixel may have moved
+        if view != self.last_view:
+            self.last_view = view
+            self.force_full = True
+
+        rects = self.previous + self.current
+        self.previous = self.current
+        self.current = []
+
+        dirty_area = sum(rect.width * rect.height for rect in rects)
+        screen_area = self.screen_rect.width * self.screen_rect.height
+        if self.force_full or dirty_area > screen_area * self.full_threshold:
+            self.force_full = False
+            self.full_flips += 1
+            pygame.display.flip()
+            return True
+
+        if rects:
+            self.partial_updates += 1
+            pygame.display.update(rects)
+        return False
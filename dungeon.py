@@ -1,15 +1,32 @@
-import pygame
 import sys
 import random
-from enum import Enum
-from collections import defaultdict, deque
-from heapq import heappush, heappop
-import math
-import pygame.mixer
+import zlib
 
 from constants import *
+from entities import Enemy
+from grid_mask import GridMask
+
+def encode_cells(cells): # Pack a row-major iterable of CellType into one byte per cell
+    return bytes(cell.value for cell in cells)
+
+def decode_cells(data): # Unpack bytes from encode_cells back into CellType values
+    lookup = {cell.value: cell for cell in CellType}
+    return [lookup[value] for value in data]
+
+def compress_cells(cells): # zlib over the byte form, walls and floors compress very well
+    return zlib.compress(encode_cells(cells))
+
+def decompress_cells(data):
+    return decode_cells(zlib.decompress(data))
+
+def map_bytes(dungeon_map): # Memory held by a list-of-lists map, the CellType members themselves are shared
+    return sys.getsizeof(dungeon_map) + sum(sys.getsizeof(row) for row in dungeon_map)
 
 class DungeonNode:
+    __slots__ = ("id", "name", "difficulty", "required_nodes", "completed", "unlocked", "position",
+                 "dungeon_map", "enemies_count", "treasures_collected", "total_treasures", "enemies", "save_dirty",
+                 "packed_map", "map_size", "last_visit")
+
     def __init__(self, node_id, name, difficulty=1, required_nodes=None):
         self.id = node_id
         self.name = name
@@ -22,6 +39,31 @@ class DungeonNode:
         self.enemies_count = 0
         self.treasures_collected = 0
         self.total_treasures = 0
+        self.enemies = []  # Enemies of this dungeon, kept between visits
+        self.save_dirty = False  # Visited since the last save
+        self.packed_map = None  # compress_cells bytes of an evicted dungeon_map
+        self.map_size = (0, 0)  # (width, height) of packed_map
+        self.last_visit = 0  # DAGManager visit clock at the last entry
+
+    def pack_map(self): # Swap a resident map for its compressed form, returns the bytes freed
+        dungeon_map = self.dungeon_map
+        if not isinstance(dungeon_map, list):
+            return 0  # Nothing loaded, or a streamed endless map that only keeps its chunk cache
+        freed = map_bytes(dungeon_map)
+        self.packed_map = compress_cells(cell for row in dungeon_map for cell in row)
+        self.map_size = (len(dungeon_map[0]), len(dungeon_map))
+        self.dungeon_map = None
+        self.enemies = [enemy for enemy in self.enemies if enemy.alive]
+        return freed - sys.getsizeof(self.packed_map)
+
+    def unpack_map(self): # Restore a packed map, returns False if there was none
+        if self.packed_map is None:
+            return False
+        width, height = self.map_size
+        cells = decompress_cells(self.packed_map)
+        self.dungeon_map = [cells[y * width:(y + 1) * width] for y in range(height)]
+        self.packed_map = None
+        return True
 
 class DungeonGenerator:
     @staticmethod
@@ -112,3 +154,89 @@ class DungeonGenerator:
             dungeon[exit_y][exit_x] = CellType.EXIT
         
         return dungeon, treasure_count
+
+    @staticmethod
+    def place_enemies(dungeon, difficulty, enemy_count=None):
+        # Create enemies
+        enemies = []
+        available_types = ENEMY_TYPES_BY_LEVEL.get(difficulty, ["goblin"])
+        if enemy_count is None:
+            enemy_count = ENEMY_COUNT_BASE + difficulty
+
+        # Ensure boss only appears once in level 5
+        boss_added = False
+
+        # Whole-map cell sets as bit masks, see grid_mask.py
+        grid = GridMask(len(dungeon[0]), len(dungeon))
+        empty = grid.from_map(dungeon, (CellType.EMPTY,))
+        walkable = grid.full & ~grid.from_map(dungeon, (CellType.WALL,))
+
+        # Find player starting position first
+        player_start = grid.first(empty)
+        player_start_x, player_start_y = player_start if player_start is not None else (None, None)
+
+        # Playable cells: empty, at least 2 empty neighbours (not in tiny isolated areas) and
+        # connected to where the player starts
+        playable = empty & grid.neighbor_count_at_least(empty, 2)
+        if player_start is not None:
+            playable &= grid.reachable(walkable, grid.bit(player_start_x, player_start_y))
+        empty_cells = grid.cells(playable)
+
+        # Create enemies with minimum distance from player - ONLY in playable areas
+        for _ in range(enemy_count):
+            attempts = 0
+            enemy_placed = False
+
+            # First try to place in rooms (preferred)
+            while attempts < 50 and not enemy_placed:
+                if empty_cells:
+                    x, y = random.choice(empty_cells)
+
+                    # Calculate distance from player start position
+                    if player_start_x is not None and player_start_y is not None:
+                        distance = abs(x - player_start_x) + abs(y - player_start_y)
+                        if distance >= 5:  # Minimum 5 blocks away
+                            enemy_type = random.choice(available_types)
+
+                            # Special handling for boss
+                            if enemy_type == "boss":
+                                if boss_added or difficulty < 5:
+                                    enemy_type = random.choice(["goblin", "orc", "archer", "mage"])
+                                else:
+                                    boss_added = True
+
+                            enemies.append(Enemy(x, y, enemy_type, difficulty))
+                            enemy_placed = True
+                    else:
+                        # Fallback if no player position found
+                        enemy_type = random.choice(available_types)
+
+                        # Special handling for boss
+                        if enemy_type == "boss":
+                            if boss_added or difficulty < 5:
+                                enemy_type = random.choice(["goblin", "orc", "archer", "mage"])
+                            else:
+                                boss_added = True
+
+                        enemies.append(Enemy(x, y, enemy_type, difficulty))
+                        enemy_placed = True
+
+                attempts += 1
+
+            # If couldn't place enemy in good location, try any valid empty space
+            if not enemy_placed:
+                cell = grid.first(empty & grid.interior() & grid.neighbor_count_at_least(empty, 1))
+                if cell is not None:
+                    x, y = cell
+                    enemy_type = random.choice(available_types)
+
+                    # Special handling for boss
+                    if enemy_type == "boss":
+                        if boss_added or difficulty < 5:
+                            enemy_type = random.choice(["goblin", "orc", "archer", "mage"])
+                        else:
+                            boss_added = True
+
+                    enemies.append(Enemy(x, y, enemy_type, difficulty))
+
+        return enemies
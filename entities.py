@@ -1,15 +1,13 @@
-import pygame
-import sys
-import random
-from enum import Enum
-from collections import defaultdict, deque
-from heapq import heappush, heappop
 import math
-import pygame.mixer
+import random
 
+import telemetry
 from constants import *
+from pathfinding import find_path, manhattan, DStarLite, next_hop_table
 
 class Player:
+    __slots__ = ("x", "y", "health", "max_health", "level", "experience")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -60,65 +58,76 @@ class Player:
         self.health = self.max_health
         self.experience = 0
 
+class EnemyArchetype: # Per-type data shared by every enemy of that type
+    __slots__ = ("name", "base_health", "health_roll", "base_damage", "damage_roll",
+                 "is_ranged", "attack_range", "color")
+
+    def __init__(self, name, base_health, health_roll, base_damage, damage_roll, is_ranged, attack_range, color):
+        self.name = name
+        self.base_health = base_health
+        self.health_roll = health_roll
+        self.base_damage = base_damage
+        self.damage_roll = damage_roll
+        self.is_ranged = is_ranged
+        self.attack_range = attack_range
+        self.color = color
+
+ENEMY_ARCHETYPES = {name: EnemyArchetype(name, *stats) for name, stats in ENEMY_STATS.items()}
+
 class Enemy:
-    def __init__(self, x, y, enemy_type="goblin", level=1):
+    __slots__ = ("x", "y", "archetype", "level", "alive", "move_timer", "attack_timer", "projectile_timer",
+                 "health", "max_health", "damage",
+                 "original_x", "original_y", "patrol_direction", "patrol_steps", "max_patrol_steps", "planner")
+
+    def __init__(self, x, y, enemy_type="goblin", level=1, stats=None):
         self.x = x
         self.y = y
-        self.type = enemy_type
+        self.archetype = ENEMY_ARCHETYPES[enemy_type]
         self.level = level
         self.alive = True
         self.move_timer = 0
         self.attack_timer = 0
         self.projectile_timer = 0
-        
-        # Set properties based on enemy type
-        self.setup_enemy_stats()
+
+        # Patrol state, set up the first time the enemy patrols
+        self.original_x = None
+        self.original_y = None
+        self.patrol_direction = None
+        self.patrol_steps = 0
+        self.max_patrol_steps = 0
+        self.planner = None  # DStarLite search kept between moves while chasing
+        
+        # Set properties based on enemy type, or take (health, max_health, damage) as given
+        # (a loaded save) without drawing from the random stream
+        if stats is None:
+            self.setup_enemy_stats()
+        else:
+            self.health, self.max_health, self.damage = stats
 
     def setup_enemy_stats(self):
-        # Meele
-        if self.type == "goblin":
-            self.health = 20 + random.randint(0, 10)
-            self.max_health = self.health
-            self.damage = 15 + random.randint(0, 5)
-            self.is_ranged = False
-            self.attack_range = 1
-            self.color = ENEMY_GOBLIN
-        
-        # Meele
-        elif self.type == "orc":
-            self.health = 40 + random.randint(0, 20)
-            self.max_health = self.health
-            self.damage = 25 + random.randint(0, 10)
-            self.is_ranged = False
-            self.attack_range = 1
-            self.color = ENEMY_ORC
-        
-        # Ranged
-        elif self.type == "archer":
-            self.health = 20
-            self.max_health = self.health
-            self.damage = 20 + random.randint(0, 10)
-            self.is_ranged = True
-            self.attack_range = 6
-            self.color = ENEMY_ARCHER
-        
-        # Ranged    
-        elif self.type == "mage":
-            self.health = 40
-            self.max_health = self.health
-            self.damage = 30 + random.randint(0, 15)
-            self.is_ranged = True
-            self.attack_range = 8
-            self.color = ENEMY_MAGE
-        
-        # Ranged    
-        elif self.type == "boss":
-            self.health = 100
-            self.max_health = self.health
-            self.damage = 40 + random.randint(0, 20)
-            self.is_ranged = True
-            self.attack_range = 10
-            self.color = ENEMY_BOSS
+        # Only health and damage vary per enemy, fixed stats stay on the archetype
+        archetype = self.archetype
+        self.health = archetype.base_health
+        if archetype.health_roll:
+            self.health += random.randint(0, archetype.health_roll)
+        self.max_health = self.health
+        self.damage = archetype.base_damage + random.randint(0, archetype.damage_roll)
+
+    @property
+    def type(self):
+        return self.archetype.name
+
+    @property
+    def is_ranged(self):
+        return self.archetype.is_ranged
+
+    @property
+    def attack_range(self):
+        return self.archetype.attack_range
+
+    @property
+    def color(self):
+        return self.archetype.color
 
     def take_damage(self, damage): # Taking damage from player
         self.health -= damage
@@ -128,57 +137,21 @@ class Enemy:
         return False
 
     def find_path_to_player(self, player_x, player_y, dungeon_map): # Use A* to find player position
-        from heapq import heappush, heappop
-        
-        start = (self.x, self.y)
-        goal = (player_x, player_y)
-        
-        if start == goal:
-            return []
-        
-        # A* algorithm
-        open_set = []
-        heappush(open_set, (0, start))
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: self.heuristic(start, goal)}
-        
-        directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]  # Down, Up, Right, Left
-        
-        while open_set:
-            current = heappop(open_set)[1]
-            
-            if current == goal:
-                # Reconstruct path
-                path = []
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                return path[::-1]  # Reverse to get path from start to goal
-            
-            for dx, dy in directions:
-                neighbor = (current[0] + dx, current[1] + dy)
-                nx, ny = neighbor
-                
-                # Check bounds and walls
-                if (0 <= nx < len(dungeon_map[0]) and 
-                    0 <= ny < len(dungeon_map) and 
-                    dungeon_map[ny][nx] != CellType.WALL):
-                    
-                    tentative_g_score = g_score[current] + 1
-                    
-                    if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                        came_from[neighbor] = current
-                        g_score[neighbor] = tentative_g_score
-                        f_score[neighbor] = tentative_g_score + self.heuristic(neighbor, goal)
-                        heappush(open_set, (f_score[neighbor], neighbor))
-        
-        return []  # No path found
+        telemetry.tick_counts[telemetry.ENEMY_PATHS] += 1
+        if ENEMY_PATHFINDER == "dstar":
+            if self.planner is None or self.planner.dungeon_map is not dungeon_map:
+                self.planner = DStarLite(dungeon_map, (self.x, self.y), (player_x, player_y))
+            return self.planner.plan((self.x, self.y), (player_x, player_y))
+        if ENEMY_PATHFINDER == "nexthop":
+            table = next_hop_table(dungeon_map)
+            if table is not None:
+                return table.path((self.x, self.y), (player_x, player_y))
+        return find_path((self.x, self.y), (player_x, player_y), dungeon_map)
 
     def heuristic(self, a, b): # Manhattan Heuristic Distance
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+        return manhattan(a, b)
         
-    def move_towards_player(self, player_x, player_y, dungeon_map, other_enemies):
+    def move_towards_player(self, player_x, player_y, dungeon_map, other_enemies, path_service=None):
         if self.move_timer > 0:
             self.move_timer -= 1
             return
@@ -190,8 +163,12 @@ class Enemy:
         
         # Only chase player if within detection range
         if distance_to_player <= ENEMY_DETECTION_RANGE:
-            # Find path to player using A*
-            path = self.find_path_to_player(player_x, player_y, dungeon_map)
+            # Find path to player using A*, answered by the path service's workers when it has it
+            path = None
+            if path_service is not None:
+                path = path_service.path((self.x, self.y), (player_x, player_y))
+            if path is None:
+                path = self.find_path_to_player(player_x, player_y, dungeon_map)
             
             if not path:
                 # If no path found, try random movement to get unstuck
@@ -223,6 +200,7 @@ class Enemy:
                     self.handle_collision_movement(player_x, player_y, dungeon_map, other_enemies)
         else:
             # Player is too far, do patrol behavior instead
+            self.planner = None  # A chase that ended has nothing worth keeping
             self.patrol_behavior(dungeon_map, other_enemies)
 
     def random_movement(self, dungeon_map, other_enemies):
@@ -288,7 +266,7 @@ class Enemy:
             self.x, self.y = best_move
     
     def patrol_behavior(self, dungeon_map, other_enemies): # Patrol behavior for enemies
-        if not hasattr(self, 'original_x'):
+        if self.original_x is None:
             # Store original position for patrol center
             self.original_x = self.x
             self.original_y = self.y
@@ -335,19 +313,19 @@ class Enemy:
             self.patrol_direction = random.choice([(0, 1), (0, -1), (1, 0), (-1, 0)])
             self.patrol_steps = 0
 
-    def update_attack_timer(self, player_x, player_y, player, dungeon_map, projectiles_list, sounds=None): # When did enemies will attack player
+    def update_attack_timer(self, player_x, player_y, player, dungeon_map, projectiles_list, play_sound=None): # When did enemies will attack player
         if not self.can_attack_player(player_x, player_y):
             self.attack_timer = 0
             return False
         
         if self.attack_timer <= 0:
-            if self.is_ranged:
+            if self.archetype.is_ranged:
                 # Ranged attack - create projectile
                 if self.has_line_of_sight(player_x, player_y, dungeon_map):
-                    projectile = self.create_projectile_to_player(player_x, player_y)
+                    projectile = self.create_projectile_to_player(player_x, player_y, dungeon_map)
                     projectiles_list.append(projectile)
-                    if sounds and "enemy_attack" in sounds:
-                        sounds["enemy_attack"].play()
+                    if play_sound is not None:
+                        play_sound("enemy_attack")
                     self.attack_timer = 60  # 1 second cooldown
             else:
                 # Melee attack - direct damage if adjacent
@@ -363,10 +341,10 @@ class Enemy:
     
     def can_attack_player(self, player_x, player_y): # Check did enemies can attack player
         distance = abs(self.x - player_x) + abs(self.y - player_y)
-        return distance <= self.attack_range
+        return distance <= self.archetype.attack_range
 
     def has_line_of_sight(self, target_x, target_y, dungeon_map): # Check if enemies has vision to player
-        if not self.is_ranged:
+        if not self.archetype.is_ranged:
             return True  # Melee enemies don't need line of sight check
         
         # Simple line of sight - no walls between enemy and target
@@ -389,7 +367,7 @@ class Enemy:
         
         return True
 
-    def create_projectile_to_player(self, player_x, player_y): # Create projectile into player positon
+    def create_projectile_to_player(self, player_x, player_y, dungeon_map): # Create projectile into player positon
         # Calculate direction
         dx = player_x - self.x
         dy = player_y - self.y
@@ -404,10 +382,20 @@ class Enemy:
         proj_x = self.x * 25 + 12.5
         proj_y = self.y * 25 + 12.5
         
-        return Projectile(proj_x, proj_y, dx, dy, speed=3, is_enemy_projectile=True)
+        return Projectile(proj_x, proj_y, dx, dy, dungeon_map, speed=3, is_enemy_projectile=True)
 
 class Projectile:
-    def __init__(self, x, y, direction_x, direction_y, speed=5, is_enemy_projectile=False):
+    # The flight line is cast once at spawn with a DDA grid walk: every cell it crosses before
+    # the first wall, the map edge or PROJECTILE_RANGE is recorded with the distance at which
+    # it is entered. The range keeps a shot down an open endless-mode corridor from walking
+    # (and generating) chunks far off screen.
+    # A frame then only advances the travelled distance and compares it with the wall
+    # distance, and update() hands back every cell swept during the frame, so a hit test on
+    # those cells cannot skip an entity or clip through a corner however fast the projectile is.
+    __slots__ = ("x", "y", "direction_x", "direction_y", "speed", "active", "is_enemy_projectile",
+                 "travelled", "wall_distance", "cells", "cell_entries", "cell_index")
+
+    def __init__(self, x, y, direction_x, direction_y, dungeon_map, speed=5, is_enemy_projectile=False):
         self.x = x
         self.y = y
         self.direction_x = direction_x
@@ -415,26 +403,56 @@ class Projectile:
         self.speed = speed
         self.active = True
         self.is_enemy_projectile = is_enemy_projectile
-        
-    def update(self, dungeon_map):
-        # Move projectile
+        self.travelled = 0.0
+        self.cell_index = 0  # Cell the projectile is in now
+        self.cast(dungeon_map)
+
+    def cast(self, dungeon_map): # Amanatides & Woo grid traversal along the flight line
+        x, y, dx, dy = self.x, self.y, self.direction_x, self.direction_y
+        width, height = len(dungeon_map[0]), len(dungeon_map)
+        grid_x, grid_y = int(x // CELL_SIZE), int(y // CELL_SIZE)
+
+        # Distance along the line to the next vertical / horizontal grid line, and between them
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        next_x = ((grid_x + (dx > 0)) * CELL_SIZE - x) / dx if dx else math.inf
+        next_y = ((grid_y + (dy > 0)) * CELL_SIZE - y) / dy if dy else math.inf
+        delta_x = CELL_SIZE / abs(dx) if dx else math.inf
+        delta_y = CELL_SIZE / abs(dy) if dy else math.inf
+
+        self.cells = []
+        self.cell_entries = []
+        distance = 0.0
+        while (distance < PROJECTILE_RANGE and 0 <= grid_x < width and 0 <= grid_y < height
+               and dungeon_map[grid_y][grid_x] != CellType.WALL):
+            self.cells.append((grid_x, grid_y))
+            self.cell_entries.append(distance)
+            if not dx and not dy:
+                break  # Nowhere to go, it expires on its first update
+            if next_x < next_y:
+                distance = next_x
+                next_x += delta_x
+                grid_x += step_x
+            else:
+                distance = next_y
+                next_y += delta_y
+                grid_y += step_y
+        self.wall_distance = min(distance, PROJECTILE_RANGE) if (dx or dy) else 0.0
+
+    def update(self): # Advance one frame, returns the cells swept this frame in flight order
+        start = self.cell_index
+        self.travelled += self.speed
         self.x += self.direction_x * self.speed
         self.y += self.direction_y * self.speed
-        
-        # Check bounds and wall collision
-        map_width = len(dungeon_map[0]) * 25  # cell_size = 25
-        map_height = len(dungeon_map) * 25
-        
-        if (self.x < 0 or self.x >= map_width or 
-            self.y < 0 or self.y >= map_height):
+
+        if self.travelled >= self.wall_distance:
+            # Reached the wall, the map edge or its range, everything up to it was still swept
             self.active = False
-            return
-        
-        # Check wall collision
-        grid_x = int(self.x // 25)
-        grid_y = int(self.y // 25)
-        
-        if (0 <= grid_x < len(dungeon_map[0]) and 
-            0 <= grid_y < len(dungeon_map)):
-            if dungeon_map[grid_y][grid_x] == CellType.WALL:
-                self.active = False
+            return self.cells[start:]
+
+        entries = self.cell_entries
+        index = start
+        while index + 1 < len(entries) and entries[index + 1] <= self.travelled:
+            index += 1
+        self.cell_index = index
+        return self.cells[start:index + 1]
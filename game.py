@@ -1,18 +1,25 @@
 import pygame
 import sys
 import random
-from enum import Enum
-from collections import defaultdict, deque
-from heapq import heappush, heappop
-import math
-import pygame.mixer
 import os
+import time
 
 from constants import *
 from entities import Player, Enemy, Projectile
 from dungeon import DungeonGenerator
 from dag_manager import DAGManager
 from dungeon import DungeonNode
+from chunked_dungeon import ChunkedDungeon
+from sprites import SpriteCache
+from dirty_rects import DirtyRectTracker
+from world_generator import WorldGenerator
+from layout import LayeredLayout
+from map_view import MapCamera, SpatialGrid
+from save_manager import SaveManager, SaveError
+from audio import AudioManager
+from path_service import PathService
+import telemetry
+from telemetry import TelemetryRecorder
 
 def resource_path(relative_path): # For path into asset file
     try:
@@ -22,6 +29,9 @@ def resource_path(relative_path): # For path into asset file
 
     return os.path.join(base_path, relative_path)
 
+# Events that count as player input for latency measurement
+INPUT_EVENT_TYPES = (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.JOYBUTTONDOWN, pygame.JOYHATMOTION, pygame.JOYAXISMOTION)
+
 class DungeonCrawlerGame:
     def __init__(self):
         pygame.joystick.init()
@@ -36,15 +46,28 @@ class DungeonCrawlerGame:
         self.joystick_move_cooldown = 200  # in milliseconds
         self.last_joystick_move_time = 0
 
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        if VSYNC:
+            # pygame only honours vsync on SCALED/OPENGL displays, flip then waits for the refresh
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+        else:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Dungeon Crawler - DAG Level System")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.Font(None, 24)
         self.title_font = pygame.font.Font(None, 48)
         self.credit_font = pygame.font.Font(None, 24)
+        self.sprites = SpriteCache()
+        self.dirty_rect_mode = DIRTY_RECT_MODE
+        self.dirty_rects = DirtyRectTracker()
+        self.last_ui_state = None
         
         self.game_state = GameState.MAP_VIEW
         self.dag_manager = DAGManager()
+        self.world_generator = WorldGenerator(WORLD_NODE_COUNT, seed=random.getrandbits(32)) if WORLD_NODE_COUNT else None
+        self.map_camera = MapCamera()
+        self.map_node_index = SpatialGrid()
+        self.map_edge_index = SpatialGrid()
+        self.map_dragging = False
         self.current_node = None
         self.player = None
         self.enemies = []
@@ -54,25 +77,47 @@ class DungeonCrawlerGame:
         self.projectiles = []
         self.enemy_projectiles = []
         self.last_direction = (0, -1)
+        self.endless_mode = ENDLESS_MODE
+        self.spawned_chunks = set()
+        self.player_chunk = None
+        self.save_manager = SaveManager()
+        self.path_service = PathService(PATH_SERVICE_WORKERS) if PATH_SERVICE_WORKERS else None
+
+        # Input sampled once per tick by poll_input, game logic reads these instead of the devices
+        self.arrow_keys = (False, False, False, False)  # up, down, left, right held
+        self.mouse_pos = (0, 0)
+        self.ticks = 0
+        self.joystick_axes = None
+        self.input_recorder = None  # replay.InputRecorder when the session is being recorded
+        self.input_source = None  # replay.InputReplay when a log is played back
+        self.on_first_frame = None  # Called once after the first frame is on screen
+        self.late_latch = LATE_LATCH_MODE
+        self.present_deadline = None  # Late latch: when the next frame should be on screen
+        self.work_estimate = 0.0  # Late latch: recent poll -> draw time in seconds
+        self.last_present = None
+        self.latency_monitor = None  # latency.LatencyMonitor when input latency is measured
+        self.telemetry = TelemetryRecorder()  # Per-tick counters, F3 switches recording on and off
 
         pygame.mixer.init()
 
-        self.sounds = {
-            "map_music": resource_path("assets/map.mp3"),
-            "battle_music": resource_path("assets/battle.mp3"),
-            "button_click": pygame.mixer.Sound(resource_path("assets/buttonclick.wav")),
-            "enemy_attack": pygame.mixer.Sound(resource_path("assets/enemiesatt.wav")),
-            "player_attack": pygame.mixer.Sound(resource_path("assets/playeratt.wav")),
-            "collect_treasure": pygame.mixer.Sound(resource_path("assets/collecttre.wav")),
-        }
-
-        self.map_music_pos = 0
+        # Decoded on a background thread, music starts as soon as its track is ready
+        self.audio = AudioManager(
+            {
+                "map": resource_path("assets/map.mp3"),
+                "battle": resource_path("assets/battle.mp3"),
+            },
+            {
+                "button_click": resource_path("assets/buttonclick.wav"),
+                "enemy_attack": resource_path("assets/enemiesatt.wav"),
+                "player_attack": resource_path("assets/playeratt.wav"),
+                "collect_treasure": resource_path("assets/collecttre.wav"),
+            },
+        )
+        self.audio.play_music("map")
+        self.audio.start_loading()
 
         self.setup_dag()
 
-        pygame.mixer.music.load(self.sounds["map_music"])
-        pygame.mixer.music.play(-1)  # Loop forever
-
     def draw_gradient_background(self, surface, color1, color2, vertical=True): # Draw background gradient
         if vertical:
             for y in range(SCREEN_HEIGHT):
@@ -159,9 +204,11 @@ class DungeonCrawlerGame:
 
     def setup_dag(self):
         # Generate random dungeon structure
-        dungeons = self.generate_random_dag()
-        dependencies = self.generate_random_dependencies(dungeons)
-        positions = self.generate_random_positions(dungeons, dependencies)
+        if self.world_generator is not None:
+            dungeons, dependencies = self.world_generator.generate()
+        else:
+            dungeons = self.generate_random_dag()
+            dependencies = self.generate_random_dependencies(dungeons)
         
         # Clear existing DAG
         self.dag_manager = DAGManager()
@@ -175,16 +222,30 @@ class DungeonCrawlerGame:
             for dep in dependencies[dungeon_id]:
                 self.dag_manager.add_edge(dep, dungeon_id)
 
-        # Generate and improve positions
-        positions = self.generate_random_positions(dungeons, dependencies)
-        improved_positions = self.improve_node_layout(positions, dependencies)
+        # Layered layout with crossing reduction
+        positions = LayeredLayout(self.dag_manager).compute()
 
-        # Apply improved positions to nodes
-        for dungeon_id, position in improved_positions.items():
+        # Apply positions to nodes
+        for dungeon_id, position in positions.items():
             self.dag_manager.nodes[dungeon_id].position = position
-                
-        # Update initial unlocked state
-        self.dag_manager.update_unlocked_nodes()
+
+        self.build_map_index()
+        self.map_camera.reset()
+
+    def build_map_index(self): # Spatial index over node circles and edge segments
+        # Labels keep their screen size at every zoom, so they are not in the index;
+        # draw_map_view widens its query by their extent instead
+        self.map_node_index = SpatialGrid()
+        self.map_edge_index = SpatialGrid()
+        for node in self.dag_manager.nodes.values():
+            x, y = node.position
+            radius = MAP_NODE_RADIUS
+            self.map_node_index.insert_rect(node.id, x - radius, y - radius, x + radius, y + radius)
+        for from_id, to_ids in self.dag_manager.adjacency_list.items():
+            from_position = self.dag_manager.nodes[from_id].position
+            for to_id in to_ids:
+                self.map_edge_index.insert_segment((from_id, to_id), from_position,
+                                                   self.dag_manager.nodes[to_id].position)
 
     def generate_random_dag(self): # Generate random DAG structure for dungeons
         # Define possible dungeon themes and names
@@ -274,264 +335,61 @@ class DungeonCrawlerGame:
         
         return dependencies
 
-    def generate_random_positions(self, dungeons, dependencies): # Make sure position tree logical
-        positions = {}
-        
-        # Group dungeons by dependency depth
-        depths = {}
-        queue = deque()
-        
-        # Find root nodes (no dependencies)
-        for dungeon_id, name, difficulty in dungeons:
-            if not dependencies[dungeon_id]:
-                depths[dungeon_id] = 0
-                queue.append(dungeon_id)
-        
-        # Calculate depth for each node using BFS
-        while queue:
-            current_id = queue.popleft()
-            current_depth = depths[current_id]
-            
-            # Find all nodes that depend on current node
-            for next_id, deps in dependencies.items():
-                if current_id in deps and next_id not in depths:
-                    # Check if all dependencies are processed
-                    all_deps_processed = all(dep in depths for dep in deps)
-                    if all_deps_processed:
-                        depths[next_id] = max(depths[dep] for dep in deps) + 1
-                        queue.append(next_id)
-        
-        # Group nodes by depth
-        depth_groups = defaultdict(list)
-        for dungeon_id, depth in depths.items():
-            depth_groups[depth].append(dungeon_id)
-        
-        # Calculate positions
-        max_depth = max(depths.values()) if depths else 0
-        vertical_spacing = (SCREEN_HEIGHT - 250) / (max_depth + 1)  # Leave margins
-        
-        for depth, nodes in depth_groups.items():
-            y = 200 + depth * vertical_spacing
-            
-            if len(nodes) == 1:
-                # Single node - center horizontally
-                x = SCREEN_WIDTH // 2
-                positions[nodes[0]] = (x, y)
-            else:
-                # Multiple nodes - distribute evenly across width
-                if len(nodes) == 2:
-                    # Special case for 2 nodes - better spacing
-                    positions[nodes[0]] = (SCREEN_WIDTH // 3, y)
-                    positions[nodes[1]] = (2 * SCREEN_WIDTH // 3, y)
-                else:
-                    # General case for multiple nodes
-                    margin = 150
-                    available_width = SCREEN_WIDTH - 2 * margin
-                    spacing = available_width / (len(nodes) - 1) if len(nodes) > 1 else 0
-                    
-                    for i, node_id in enumerate(nodes):
-                        if len(nodes) == 1:
-                            x = SCREEN_WIDTH // 2
-                        else:
-                            x = margin + i * spacing
-                        positions[node_id] = (x, y)
-        
-        return positions
-
-    def improve_node_layout(self, positions, dependencies): # Improve node layout by minimizing edges and other
-        improved_positions = positions.copy()
-        
-        # Group nodes by y-coordinate (depth level)
-        levels = defaultdict(list)
-        for node_id, (x, y) in positions.items():
-            levels[y].append((node_id, x))
-        
-        # Sort nodes within each level and redistribute
-        for y, nodes in levels.items():
-            if len(nodes) <= 1:
-                continue
-                
-            # Sort by dependencies - nodes with more connections get better positions
-            def connection_count(node_id):
-                incoming = len(dependencies.get(node_id, []))
-                outgoing = len([1 for deps in dependencies.values() if node_id in deps])
-                return incoming + outgoing
-            
-            nodes.sort(key=lambda item: connection_count(item[0]), reverse=True)
-            
-            # Redistribute positions
-            if len(nodes) == 2:
-                improved_positions[nodes[0][0]] = (SCREEN_WIDTH // 3, y)
-                improved_positions[nodes[1][0]] = (2 * SCREEN_WIDTH // 3, y)
-            else:
-                margin = 120
-                available_width = SCREEN_WIDTH - 2 * margin
-                spacing = available_width / (len(nodes) - 1) if len(nodes) > 1 else 0
-                
-                for i, (node_id, _) in enumerate(nodes):
-                    x = margin + i * spacing
-                    improved_positions[node_id] = (x, y)
-        
-        return improved_positions
-
     def enter_dungeon(self, node_id):
         node = self.dag_manager.nodes[node_id]
         if not node.unlocked:
             return
+        node = self.dag_manager.visit(node_id)  # Unpacks the map if it was evicted
+        self.dag_manager.evict_idle_maps(keep_id=node_id)
         
-        # Pause map music and remember position
-        self.map_music_pos = pygame.mixer.music.get_pos()
-        pygame.mixer.music.stop()
-
-        # Play battle music
-        pygame.mixer.music.load(self.sounds["battle_music"])
-        pygame.mixer.music.set_volume(0.7)
-        pygame.mixer.music.play(-1)
-
+        # Fade the map music out (it resumes from here later) and battle music in
+        self.audio.play_music("battle", restart=True)
             
         self.current_node = node
         self.game_state = GameState.DUNGEON
+        node.save_dirty = True
+
+        # Dungeons from a loaded save are only deserialized when entered
+        if node.dungeon_map is None:
+            self.save_manager.load_node(node)
         
         # Generate dungeon if not exists
-        if node.dungeon_map is None:
+        if node.dungeon_map is None and self.endless_mode:
+            self.setup_endless_dungeon(node)
+        elif node.dungeon_map is None:
             dungeon_map, treasure_count = DungeonGenerator.generate_dungeon(25, 20, node.difficulty)
             node.dungeon_map = dungeon_map
             node.total_treasures = treasure_count
             node.treasures_collected = 0
             
             # Create enemies
-            self.enemies = []
-            enemy_types_by_level = {
-                1: ["goblin"],
-                2: ["goblin", "orc"],
-                3: ["goblin", "orc", "archer"],
-                4: ["goblin", "orc", "archer", "mage"],
-                5: ["goblin", "orc", "archer", "mage", "boss"]
-            }
-
-            available_types = enemy_types_by_level.get(node.difficulty, ["goblin"])
-            enemy_count = 2 + node.difficulty
-
-            # Ensure boss only appears once in level 5
-            boss_added = False
-
-            # Find player starting position first
-            player_start_x, player_start_y = None, None
-            for y in range(len(dungeon_map)):
-                for x in range(len(dungeon_map[0])):
-                    if dungeon_map[y][x] == CellType.EMPTY:
-                        player_start_x, player_start_y = x, y
-                        break
-                if player_start_x is not None:
-                    break
-
-            # Create enemies with minimum distance from player - ONLY in playable areas
-            for _ in range(enemy_count):
-                attempts = 0
-                enemy_placed = False
-                
-                # First try to place in rooms (preferred)
-                while attempts < 50 and not enemy_placed:
-                    # Try to place in a random room first
-                    if hasattr(self, 'current_rooms') or True:  # We'll get rooms from generator
-                        # Find all empty cells in playable area
-                        empty_cells = []
-                        for y in range(len(dungeon_map)):
-                            for x in range(len(dungeon_map[0])):
-                                if dungeon_map[y][x] == CellType.EMPTY:
-                                    # Check if it's reasonably accessible (not in tiny isolated areas)
-                                    adjacent_empty = 0
-                                    for dx, dy in [(0,1), (0,-1), (1,0), (-1,0)]:
-                                        nx, ny = x + dx, y + dy
-                                        if (0 <= nx < len(dungeon_map[0]) and 
-                                            0 <= ny < len(dungeon_map) and 
-                                            dungeon_map[ny][nx] == CellType.EMPTY):
-                                            adjacent_empty += 1
-                                    
-                                    # Only consider cells with at least 2 adjacent empty spaces
-                                    if adjacent_empty >= 2:
-                                        empty_cells.append((x, y))
-                        
-                        if empty_cells:
-                            x, y = random.choice(empty_cells)
-                            
-                            # Calculate distance from player start position
-                            if player_start_x is not None and player_start_y is not None:
-                                distance = abs(x - player_start_x) + abs(y - player_start_y)
-                                if distance >= 5:  # Minimum 5 blocks away
-                                    # TAMBAHKAN KODE ANDA DI SINI:
-                                    enemy_type = random.choice(available_types)
-                                    
-                                    # Special handling for boss
-                                    if enemy_type == "boss":
-                                        if boss_added or node.difficulty < 5:
-                                            enemy_type = random.choice(["goblin", "orc", "archer", "mage"])
-                                        else:
-                                            boss_added = True
-                                    
-                                    self.enemies.append(Enemy(x, y, enemy_type, node.difficulty))
-                                    enemy_placed = True
-                            else:
-                                # Fallback if no player position found
-                                # TAMBAHKAN KODE ANDA DI SINI JUGA:
-                                enemy_type = random.choice(available_types)
-                                
-                                # Special handling for boss
-                                if enemy_type == "boss":
-                                    if boss_added or node.difficulty < 5:
-                                        enemy_type = random.choice(["goblin", "orc", "archer", "mage"])
-                                    else:
-                                        boss_added = True
-                                
-                                self.enemies.append(Enemy(x, y, enemy_type, node.difficulty))
-                                enemy_placed = True
-                    
-                    attempts += 1
-                
-                # If couldn't place enemy in good location, try any valid empty space
-                if not enemy_placed:
-                    for y in range(1, len(dungeon_map) - 1):  # Avoid edges
-                        for x in range(1, len(dungeon_map[0]) - 1):  # Avoid edges
-                            if dungeon_map[y][x] == CellType.EMPTY:
-                                # Check if position has access (not isolated)
-                                accessible = False
-                                for dx, dy in [(0,1), (0,-1), (1,0), (-1,0)]:
-                                    nx, ny = x + dx, y + dy
-                                    if (0 <= nx < len(dungeon_map[0]) and 
-                                        0 <= ny < len(dungeon_map) and 
-                                        dungeon_map[ny][nx] == CellType.EMPTY):
-                                        accessible = True
-                                        break
-                                
-                                if accessible:
-                                    # TAMBAHKAN KODE ANDA DI SINI JUGA:
-                                    enemy_type = random.choice(available_types)
-                                    
-                                    # Special handling for boss
-                                    if enemy_type == "boss":
-                                        if boss_added or node.difficulty < 5:
-                                            enemy_type = random.choice(["goblin", "orc", "archer", "mage"])
-                                        else:
-                                            boss_added = True
-                                    
-                                    self.enemies.append(Enemy(x, y, enemy_type, node.difficulty))
-                                    break
-                        else:
-                            continue
-                        break
-
+            self.enemies = DungeonGenerator.place_enemies(dungeon_map, node.difficulty)
             node.enemies_count = len(self.enemies)
+            node.enemies = self.enemies
         else:
             # Restore existing state
-            self.enemies = [e for e in self.enemies if e.alive]
+            self.enemies = node.enemies = [e for e in node.enemies if e.alive]
         
         self.dungeon_map = node.dungeon_map
+        if self.path_service is not None:
+            # Streamed endless maps have no fixed grid to share, their enemies search on the main thread
+            self.path_service.set_map(self.dungeon_map if isinstance(self.dungeon_map, list) else None)
         
         # Place player at entrance (first empty cell)
         if self.player is None:
             self.player = Player(0, 0)
             
         # Find starting position
+        if isinstance(self.dungeon_map, ChunkedDungeon):
+            self.player.x, self.player.y = self.dungeon_map.start_position
+            self.player_chunk = None
+            # Every chunk spawns again on entry, minus the enemies killed on earlier visits
+            self.dungeon_map.record_kills()
+            self.dungeon_map.spawned_enemies.clear()
+            self.spawned_chunks = set()
+            self.update_camera()
+            return
+
         for y in range(len(self.dungeon_map)):
             for x in range(len(self.dungeon_map[0])):
                 if self.dungeon_map[y][x] == CellType.EMPTY:
@@ -540,9 +398,74 @@ class DungeonCrawlerGame:
             else:
                 continue
             break
+
+        self.update_camera()
+
+    def setup_endless_dungeon(self, node): # Streaming dungeon, chunks and their enemies load around the player
+        node.dungeon_map = ChunkedDungeon(random.getrandbits(32), node.difficulty)
+        node.total_treasures = 0
+        node.treasures_collected = 0
+        node.enemies_count = 0
+        self.enemies = []
+
+    def update_endless_chunks(self):
+        chunk = self.dungeon_map.chunk_key(self.player.x, self.player.y)
+        if chunk == self.player_chunk:
+            return
+        self.player_chunk = chunk
+
+        radius = ENDLESS_ACTIVE_RADIUS
+        active = set()
+        for dy in range(-radius, radius + 1):
+            for dx in range(-radius, radius + 1):
+                cx, cy = chunk[0] + dx, chunk[1] + dy
+                if 0 <= cx < self.dungeon_map.world_chunks and 0 <= cy < self.dungeon_map.world_chunks:
+                    active.add((cx, cy))
+
+        # Enemies outside the active window are dropped, their chunk spawns them again on
+        # return; killed ones are remembered by spawn cell and never come back
+        dungeon = self.dungeon_map
+        dungeon.record_kills()
+        self.enemies = [e for e in self.enemies
+                        if e.alive and dungeon.chunk_key(e.x, e.y) in active]
+        self.spawned_chunks &= active
+        for cell in [cell for cell in dungeon.spawned_enemies if dungeon.chunk_key(*cell) not in self.spawned_chunks]:
+            del dungeon.spawned_enemies[cell]
+
+        available_types = [t for t in ENEMY_TYPES_BY_LEVEL.get(self.current_node.difficulty, ["goblin"])
+                           if t != "boss"]
+        for cx, cy in sorted(active - self.spawned_chunks):
+            self.spawned_chunks.add((cx, cy))
+            rng = self.dungeon_map.chunk_rng(cx, cy, ":types")
+            for x, y in self.dungeon_map.chunk_spawns(cx, cy):
+                if abs(x - self.player.x) + abs(y - self.player.y) >= 5:
+                    enemy_type = rng.choice(available_types)  # Drawn for killed cells too, the rest keep their types
+                    if (x, y) not in dungeon.killed_spawns:
+                        enemy = Enemy(x, y, enemy_type, self.current_node.difficulty)
+                        self.enemies.append(enemy)
+                        dungeon.spawned_enemies[(x, y)] = enemy
+
+        self.current_node.enemies_count = len(self.enemies)
     
+    def poll_input(self): # Read this tick's events and input state, from the devices or a replay log
+        if self.input_source is not None:
+            return self.input_source.next_tick(self)
+
+        events = pygame.event.get()
+        keys = pygame.key.get_pressed()
+        self.arrow_keys = (keys[pygame.K_UP], keys[pygame.K_DOWN], keys[pygame.K_LEFT], keys[pygame.K_RIGHT])
+        self.mouse_pos = pygame.mouse.get_pos()
+        self.ticks = pygame.time.get_ticks()
+        self.joystick_axes = (self.joystick.get_axis(0), self.joystick.get_axis(1)) if self.joystick else None
+
+        if self.input_recorder is not None:
+            self.input_recorder.record(self, events)
+        if self.latency_monitor is not None:
+            self.latency_monitor.input_polled(any(event.type in INPUT_EVENT_TYPES for event in events))
+        return events
+
     def handle_events(self): # Handle event happen in the game
-        for event in pygame.event.get():
+        for event in self.poll_input():
             if event.type == pygame.JOYAXISMOTION:
                 if self.game_state == GameState.DUNGEON:
                     self.handle_joystick_motion()
@@ -560,27 +483,41 @@ class DungeonCrawlerGame:
             if event.type == pygame.QUIT:
                 return False
             
-            if event.type == pygame.KEYDOWN:
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                print(f"Telemetry {'on' if self.telemetry.toggle() else 'off'}")
+            elif event.type == pygame.KEYDOWN:
                 if self.game_state == GameState.MAP_VIEW:
                     self.handle_map_input(event.key)
                 elif self.game_state == GameState.DUNGEON:
                     self.handle_dungeon_input(event.key)
                 elif self.game_state == GameState.VICTORY:
                     if event.key == pygame.K_SPACE:
-                        self.sounds["button_click"].play()
+                        self.audio.play_sound("button_click")
                         self.game_state = GameState.MAP_VIEW
                 elif self.game_state == GameState.GAME_OVER:
                     if event.key == pygame.K_SPACE:
-                        self.sounds["button_click"].play()
+                        self.audio.play_sound("button_click")
                         self.restart_game()
                     elif event.key == pygame.K_ESCAPE:
-                        self.sounds["button_click"].play()
+                        self.audio.play_sound("button_click")
                         pygame.quit()
                         sys.exit()
             
             if event.type == pygame.MOUSEBUTTONDOWN and self.game_state == GameState.MAP_VIEW:
-                self.sounds["button_click"].play()
-                self.handle_map_click(event.pos)
+                if event.button == 1:
+                    self.audio.play_sound("button_click")
+                    self.handle_map_click(event.pos)
+                elif event.button in (2, 3):  # Middle / right drag pans the map
+                    self.map_dragging = True
+
+            if event.type == pygame.MOUSEBUTTONUP and event.button in (2, 3):
+                self.map_dragging = False
+
+            if event.type == pygame.MOUSEMOTION and self.map_dragging and self.game_state == GameState.MAP_VIEW:
+                self.map_camera.pan(*event.rel)
+
+            if event.type == pygame.MOUSEWHEEL and self.game_state == GameState.MAP_VIEW:
+                self.map_camera.zoom_at(1.1 ** event.y, self.mouse_pos)
         
         return True
     
@@ -590,27 +527,66 @@ class DungeonCrawlerGame:
             sys.exit()
         elif key == pygame.K_r:  # Press R to regenerate map
             self.setup_dag()
+        elif key == pygame.K_F5:
+            self.save_game()
+        elif key == pygame.K_F9:
+            self.load_game()
+        elif key == pygame.K_LEFT:
+            self.map_camera.pan(MAP_PAN_STEP, 0)
+        elif key == pygame.K_RIGHT:
+            self.map_camera.pan(-MAP_PAN_STEP, 0)
+        elif key == pygame.K_UP:
+            self.map_camera.pan(0, MAP_PAN_STEP)
+        elif key == pygame.K_DOWN:
+            self.map_camera.pan(0, -MAP_PAN_STEP)
+    
+    def save_game(self):
+        written = self.save_manager.save(self.dag_manager, self.player)
+        print(f"Game saved ({written} dungeons written)")
+
+    def load_game(self):
+        if not self.save_manager.has_save():
+            return
+        try:
+            dag_manager, player = self.save_manager.load()
+        except (OSError, SaveError) as e:
+            print(f"Could not load save: {e}")
+            return
+
+        self.dag_manager = dag_manager
+        self.player = player
+        self.enemies = []
+        self.projectiles = []
+        self.enemy_projectiles = []
+        self.current_node = None
+        self.dungeon_map = None
+        self.build_map_index()
+        self.map_camera.reset()
+        self.game_state = GameState.MAP_VIEW
     
     def handle_map_click(self, pos): # A bit useless but i think place it here
-        mouse_x, mouse_y = pos
-        
-        for node in self.dag_manager.nodes.values():
-            node_x, node_y = node.position
-            distance = math.sqrt((mouse_x - node_x)**2 + (mouse_y - node_y)**2)
-            
-            if distance <= 30:  # Click radius
-                if node.unlocked:
-                    self.enter_dungeon(node.id)
-                break
+        world_x, world_y = self.map_camera.screen_to_world(*pos)
+        # The drawn node circle in world units, it only stops shrinking at 1 screen pixel
+        zoom = self.map_camera.zoom
+        radius = max(1, int(MAP_NODE_RADIUS * zoom)) / zoom
+        
+        # Only nodes in the grid buckets around the click are distance-tested
+        closest = None
+        closest_distance = radius * radius
+        for node_id in self.map_node_index.query_point(world_x, world_y, radius):
+            node_x, node_y = self.dag_manager.nodes[node_id].position
+            distance = (world_x - node_x) ** 2 + (world_y - node_y) ** 2
+            if distance <= closest_distance:
+                closest = self.dag_manager.nodes[node_id]
+                closest_distance = distance
+        
+        if closest is not None and closest.unlocked:
+            self.enter_dungeon(closest.id)
     
     def handle_dungeon_input(self, key):
         if key == pygame.K_ESCAPE:
-            pygame.mixer.music.stop()  # Stop dungeon (battle) music
-
             # Resume map music from where it left off
-            pygame.mixer.music.load(self.sounds["map_music"])
-            pygame.mixer.music.set_volume(1.0)
-            pygame.mixer.music.play(-1, start=self.map_music_pos / 1000.0)
+            self.audio.play_music("map")
 
             self.game_state = GameState.MAP_VIEW
         elif key == pygame.K_UP:
@@ -628,28 +604,27 @@ class DungeonCrawlerGame:
         elif key == pygame.K_SPACE:
             self.shoot_projectile()
     
-        keys = pygame.key.get_pressed()
-        if sum([keys[pygame.K_UP], keys[pygame.K_DOWN], keys[pygame.K_LEFT], keys[pygame.K_RIGHT]]) > 1:
+        if sum(self.arrow_keys) > 1:
             # Make sure there's no extra move if pressed two button at the same time and it will count as one move per keys
             pass
     
     def shoot_projectile(self): # Shooting goes brrrr
-        keys = pygame.key.get_pressed()
-        self.sounds["player_attack"].play()
+        up, down, left, right = self.arrow_keys
+        self.audio.play_sound("player_attack")
         
         # Determine direction based on current key press
         direction_x, direction_y = 0, 0
         
-        if keys[pygame.K_UP]:
+        if up:
             direction_y = -1
             self.last_direction = (0, -1)
-        elif keys[pygame.K_DOWN]:
+        elif down:
             direction_y = 1
             self.last_direction = (0, 1)
-        elif keys[pygame.K_LEFT]:
+        elif left:
             direction_x = -1
             self.last_direction = (-1, 0)
-        elif keys[pygame.K_RIGHT]:
+        elif right:
             direction_x = 1
             self.last_direction = (1, 0)
         else:
@@ -665,62 +640,30 @@ class DungeonCrawlerGame:
             proj_y = self.player.y * 25 + 12.5
             
             # Fix : Using correct parameter
-            projectile = Projectile(proj_x, proj_y, direction_x, direction_y, speed=5, is_enemy_projectile=False)
+            projectile = Projectile(proj_x, proj_y, direction_x, direction_y, self.dungeon_map,
+                                    speed=5, is_enemy_projectile=False)
             self.projectiles.append(projectile)
 
-    def update_projectiles(self):
-        for projectile in self.projectiles[:]:  # Copy list for safety iteration
-            if not projectile.active:
-                self.projectiles.remove(projectile)
-                continue
-                
-            projectile.update(self.dungeon_map)
-            
-            if not projectile.active:
-                continue
-            
-            # Check collision with enemies
-            proj_grid_x = int(projectile.x // 25)
-            proj_grid_y = int(projectile.y // 25)
-            
-            for enemy in self.enemies:
-                if enemy.alive and enemy.x == proj_grid_x and enemy.y == proj_grid_y:
-                    # Hit enemy
-                    enemy.alive = False
-                    projectile.active = False
-                    self.player.gain_experience(25)
-                    break
-        
-        # Remove inactive projectiles
-        self.projectiles = [p for p in self.projectiles if p.active]
-
-    def draw_projectiles(self):
-        # Player projectiles with glow effect
-        for projectile in self.projectiles:
-            if projectile.active:
-                screen_x = projectile.x - self.camera_x
-                screen_y = projectile.y - self.camera_y
-                
-                if (-10 <= screen_x <= SCREEN_WIDTH + 10 and 
-                    -10 <= screen_y <= SCREEN_HEIGHT + 10):
-                    # Glow effect
-                    pygame.draw.circle(self.screen, LIGHT_BLUE, (int(screen_x), int(screen_y)), 5)
-                    pygame.draw.circle(self.screen, DARK_BLUE, (int(screen_x), int(screen_y)), 3)
-                    pygame.draw.circle(self.screen, WHITE, (int(screen_x), int(screen_y)), 2)
-        
-        # Enemy projectiles with different styling
-        for projectile in self.enemy_projectiles:
-            if projectile.active:
-                screen_x = projectile.x - self.camera_x
-                screen_y = projectile.y - self.camera_y
-                
-                if (-10 <= screen_x <= SCREEN_WIDTH + 10 and 
-                    -10 <= screen_y <= SCREEN_HEIGHT + 10):
-                    # Dark projectile with red glow
-                    pygame.draw.circle(self.screen, RED, (int(screen_x), int(screen_y)), 5)
-                    pygame.draw.circle(self.screen, DARK_GRAY, (int(screen_x), int(screen_y)), 3)
-                    pygame.draw.circle(self.screen, WHITE, (int(screen_x), int(screen_y)), 1)
+    def queue_projectile_sprites(self, blits): # Add visible projectiles to the frame's blit batch
+        for projectiles, is_enemy_projectile in ((self.projectiles, False), (self.enemy_projectiles, True)):
+            sprite = self.sprites.projectile(is_enemy_projectile)
+            for projectile in projectiles:
+                if projectile.active:
+                    screen_x = projectile.x - self.camera_x
+                    screen_y = projectile.y - self.camera_y
+                    
+                    if (-10 <= screen_x <= SCREEN_WIDTH + 10 and 
+                        -10 <= screen_y <= SCREEN_HEIGHT + 10):
+                        blits.append((sprite, (int(screen_x) - 5, int(screen_y) - 5)))
     
+    def request_enemy_paths(self): # Enemies that chase on the next tick get their search done by the workers meanwhile
+        player = (self.player.x, self.player.y)
+        for enemy in self.enemies:
+            if (enemy.alive and enemy.move_timer == 0
+                    and abs(enemy.x - player[0]) + abs(enemy.y - player[1]) <= ENEMY_DETECTION_RANGE):
+                self.path_service.request((enemy.x, enemy.y), player)
+        self.path_service.submit()
+
     def update_game(self):
         if self.game_state == GameState.DUNGEON:
             self.update_dungeon()
@@ -730,19 +673,29 @@ class DungeonCrawlerGame:
         if self.player.health <= 0:
             self.game_state = GameState.GAME_OVER
             return
+
+        if isinstance(self.dungeon_map, ChunkedDungeon):
+            self.update_endless_chunks()
         
+        if self.path_service is not None:
+            self.path_service.collect()
+
         # Update enemies
         for enemy in self.enemies:
             if enemy.alive:
-                enemy.move_towards_player(self.player.x, self.player.y, self.dungeon_map, self.enemies)
+                enemy.move_towards_player(self.player.x, self.player.y, self.dungeon_map, self.enemies,
+                                          self.path_service)
                 
                 # Update attack timer and check for damage
                 player_died = enemy.update_attack_timer(self.player.x, self.player.y, self.player, 
-                                                        self.dungeon_map, self.enemy_projectiles, self.sounds)
+                                                        self.dungeon_map, self.enemy_projectiles, self.audio.play_sound)
                 if player_died:
                     self.game_state = GameState.GAME_OVER
                     return
 
+        if self.path_service is not None:
+            self.request_enemy_paths()
+
         self.update_projectiles()
         self.update_enemy_projectiles()
         
@@ -752,10 +705,12 @@ class DungeonCrawlerGame:
         
         if cell == CellType.TREASURE:
             self.dungeon_map[player_y][player_x] = CellType.EMPTY
+            self.dirty_rects.add((player_x * CELL_SIZE - self.camera_x, player_y * CELL_SIZE - self.camera_y,
+                                  CELL_SIZE, CELL_SIZE))
             self.current_node.treasures_collected += 1
-            self.player.heal(20)
+            self.player.heal(TREASURE_HEAL)
             self.player.gain_experience(10)
-            self.sounds["collect_treasure"].play()
+            self.audio.play_sound("collect_treasure")
         
         # Check completion conditions
         alive_enemies = sum(1 for e in self.enemies if e.alive)
@@ -770,23 +725,12 @@ class DungeonCrawlerGame:
         self.update_camera()
 
     def update_enemy_projectiles(self): # Updating enemies projectiles inside the dungeon
-        for projectile in self.enemy_projectiles[:]:
-            if not projectile.active:
-                self.enemy_projectiles.remove(projectile)
-                continue
-                
-            projectile.update(self.dungeon_map)
-            
-            if not projectile.active:
-                continue
-            
-            # Check collision with player
-            proj_grid_x = int(projectile.x // 25)
-            proj_grid_y = int(projectile.y // 25)
-            
-            if proj_grid_x == self.player.x and proj_grid_y == self.player.y:
+        player_cell = (self.player.x, self.player.y)
+        for projectile in self.enemy_projectiles:
+            # Check collision with player anywhere along this frame's flight
+            if player_cell in projectile.update():
                 # Hit player
-                player_died = self.player.take_damage(20)  # Enemy projectile damage
+                player_died = self.player.take_damage(ENEMY_PROJECTILE_DAMAGE)
                 projectile.active = False
                 if player_died:
                     self.game_state = GameState.GAME_OVER
@@ -796,27 +740,16 @@ class DungeonCrawlerGame:
         self.enemy_projectiles = [p for p in self.enemy_projectiles if p.active]
 
     def update_projectiles(self):
-        # Changing method to check enemies health
-        for projectile in self.projectiles[:]:
-            if not projectile.active:
-                self.projectiles.remove(projectile)
-                continue
-                
-            projectile.update(self.dungeon_map)
-            
-            if not projectile.active:
-                continue
-            
-            # Check collision with enemies
-            proj_grid_x = int(projectile.x // 25)
-            proj_grid_y = int(projectile.y // 25)
-            
-            for enemy in self.enemies:
-                if enemy.alive and enemy.x == proj_grid_x and enemy.y == proj_grid_y:
+        enemy_at = {(enemy.x, enemy.y): enemy for enemy in self.enemies if enemy.alive}
+        for projectile in self.projectiles:
+            # Check collision with enemies in every cell swept this frame, nearest first
+            for cell in projectile.update():
+                enemy = enemy_at.get(cell)
+                if enemy is not None:
                     # Hit enemy
-                    enemy_died = enemy.take_damage(20)  # Player projectile damage
                     projectile.active = False
-                    if enemy_died:
+                    if enemy.take_damage(PLAYER_PROJECTILE_DAMAGE):
+                        del enemy_at[cell]
                         self.player.gain_experience(25)
                     break
         
@@ -824,29 +757,44 @@ class DungeonCrawlerGame:
         self.projectiles = [p for p in self.projectiles if p.active]
 
     def complete_dungeon(self):
-        self.current_node.completed = True
-        self.dag_manager.update_unlocked_nodes()
+        self.dag_manager.complete_node(self.current_node.id)
+        self.dag_manager.evict_idle_maps()
 
-        pygame.mixer.music.stop()
-        pygame.mixer.music.load(self.sounds["map_music"])
-        pygame.mixer.music.play(-1, start=self.map_music_pos / 1000.0)
+        self.audio.play_music("map")
         
         # Check if all nodes completed
-        all_completed = all(node.completed for node in self.dag_manager.nodes.values())
-        if all_completed:
+        if self.dag_manager.all_completed():
             self.game_state = GameState.VICTORY
         else:
             self.game_state = GameState.MAP_VIEW
 
-    def update_camera(self):
-        # Center camera on map center instead of player
+    def update_camera(self): # Follow the player, clamped so the view never shows past the map edges
         if self.dungeon_map:
-            cell_size = 25
+            cell_size = CELL_SIZE
             map_width = len(self.dungeon_map[0]) * cell_size
             map_height = len(self.dungeon_map) * cell_size
-            
-            self.camera_x = (map_width - SCREEN_WIDTH) // 2
-            self.camera_y = (map_height - SCREEN_HEIGHT) // 2
+
+            target_x = self.player.x * cell_size + cell_size // 2 - SCREEN_WIDTH // 2
+            target_y = self.player.y * cell_size + cell_size // 2 - SCREEN_HEIGHT // 2
+
+            # Maps smaller than the screen stay centered
+            if map_width <= SCREEN_WIDTH:
+                self.camera_x = (map_width - SCREEN_WIDTH) // 2
+            else:
+                self.camera_x = max(0, min(target_x, map_width - SCREEN_WIDTH))
+
+            if map_height <= SCREEN_HEIGHT:
+                self.camera_y = (map_height - SCREEN_HEIGHT) // 2
+            else:
+                self.camera_y = max(0, min(target_y, map_height - SCREEN_HEIGHT))
+
+    def visible_tile_range(self): # Inclusive tile bounds covered by the camera, clamped to the map
+        cell_size = CELL_SIZE
+        first_x = max(0, self.camera_x // cell_size)
+        first_y = max(0, self.camera_y // cell_size)
+        last_x = min(len(self.dungeon_map[0]) - 1, (self.camera_x + SCREEN_WIDTH) // cell_size)
+        last_y = min(len(self.dungeon_map) - 1, (self.camera_y + SCREEN_HEIGHT) // cell_size)
+        return first_x, first_y, last_x, last_y
         
     def restart_game(self):
         # Reset all nodes
@@ -854,6 +802,7 @@ class DungeonCrawlerGame:
             node.completed = False
             node.unlocked = False
             node.dungeon_map = None
+            node.packed_map = None
             node.enemies_count = 0
             node.treasures_collected = 0
             node.total_treasures = 0
@@ -903,32 +852,51 @@ class DungeonCrawlerGame:
         credit_rect = credit_text.get_rect(topright=(self.screen.get_width() -20, 15))
         self.screen.blit(credit_text, credit_rect)
         
+        # Only nodes and edges whose grid buckets overlap the camera view get drawn
+        camera = self.map_camera
+        zoom = camera.zoom
+        view = camera.visible_world_rect()
+        
         # Draw connections with better styling
-        for from_id, to_ids in self.dag_manager.adjacency_list.items():
+        for from_id, to_id in self.map_edge_index.query_rect(*view):
             from_node = self.dag_manager.nodes[from_id]
-            for to_id in to_ids:
-                to_node = self.dag_manager.nodes[to_id]
-                
-                if from_node.completed:
-                    color = DARK_GREEN
-                    width = 4
-                elif from_node.unlocked:
-                    color = GOLD
-                    width = 3
-                else:
-                    color = MEDIUM_GRAY
-                    width = 2
-                
-                # Draw line with glow effect
-                pygame.draw.line(self.screen, color, from_node.position, to_node.position, width + 2)
-                pygame.draw.line(self.screen, WHITE, from_node.position, to_node.position, width)
-        
+            to_node = self.dag_manager.nodes[to_id]
+            
+            if from_node.completed:
+                color = DARK_GREEN
+                width = 4
+            elif from_node.unlocked:
+                color = GOLD
+                width = 3
+            else:
+                color = MEDIUM_GRAY
+                width = 2
+            
+            # Draw line with glow effect
+            start = camera.world_to_screen(*from_node.position)
+            end = camera.world_to_screen(*to_node.position)
+            pygame.draw.line(self.screen, color, start, end, width + 2)
+            pygame.draw.line(self.screen, WHITE, start, end, width)
+        
+        # Nodes are queried with the view widened by how far their labels reach past the
+        # circle, that reach is in screen pixels so it is converted to world units here
+        circle = max(1, int(MAP_NODE_RADIUS * zoom))
+        draw_labels = zoom >= MAP_LABEL_MIN_ZOOM
+        if draw_labels:
+            reach_x = max(0, MAP_LABEL_WIDTH / 2 - circle) / zoom
+            reach_y = (MAP_LABEL_GAP + MAP_LABEL_HEIGHT) / zoom
+        else:
+            reach_x = reach_y = 0
+        min_x, min_y, max_x, max_y = view
+        node_view = (min_x - reach_x, min_y - reach_y, max_x + reach_x, max_y + reach_y)
+
         # Draw nodes with fancy styling
-        for node in self.dag_manager.nodes.values():
-            x, y = node.position
+        for node_id in self.map_node_index.query_rect(*node_view):
+            node = self.dag_manager.nodes[node_id]
+            x, y = camera.world_to_screen(*node.position)
             
             # Node shadow
-            pygame.draw.circle(self.screen, (100, 100, 100), (int(x + 3), int(y + 3)), 33)
+            pygame.draw.circle(self.screen, (100, 100, 100), (int(x + 3 * zoom), int(y + 3 * zoom)), max(1, int(33 * zoom)))
             
             # Determine node color and style
             if node.completed:
@@ -948,28 +916,33 @@ class DungeonCrawlerGame:
                 icon = ""
             
             # Main node circle
-            pygame.draw.circle(self.screen, main_color, (int(x), int(y)), 35)
-            pygame.draw.circle(self.screen, border_color, (int(x), int(y)), 35, 4)
-            pygame.draw.circle(self.screen, inner_color, (int(x), int(y)), 25)
+            pygame.draw.circle(self.screen, main_color, (int(x), int(y)), circle)
+            pygame.draw.circle(self.screen, border_color, (int(x), int(y)), circle, max(1, int(4 * zoom)))
+            pygame.draw.circle(self.screen, inner_color, (int(x), int(y)), max(1, int(25 * zoom)))
+            
+            # Labels are skipped when zoomed far out, they would only overlap
+            if not draw_labels:
+                continue
             
             # Node icon
             icon_surface = self.font.render(icon, True, border_color)
             icon_rect = icon_surface.get_rect(center=(x, y))
             self.screen.blit(icon_surface, icon_rect)
             
-            # Node name with background
-            name_bg_rect = pygame.Rect(x - 80, y - 70, 160, 25)
+            # Node name with background, a screen-sized box just above the circle
+            name_bg_rect = pygame.Rect(0, 0, MAP_LABEL_WIDTH, MAP_LABEL_HEIGHT)
+            name_bg_rect.midbottom = (int(x), int(y) - circle - MAP_LABEL_GAP)
             pygame.draw.rect(self.screen, CREAM, name_bg_rect, border_radius=12)
             pygame.draw.rect(self.screen, border_color, name_bg_rect, 2, border_radius=12)
             
             name_text = self.font.render(node.name, True, DARK_BLUE)
-            name_rect = name_text.get_rect(center=(x, y - 57))
+            name_rect = name_text.get_rect(center=name_bg_rect.center)
             self.screen.blit(name_text, name_rect)
             
             # Difficulty with stars
             stars = "" * node.difficulty
             diff_text = self.font.render(f"Level {node.difficulty} {stars}", True, GOLD)
-            diff_rect = diff_text.get_rect(center=(x, y + 50))
+            diff_rect = diff_text.get_rect(center=(x, y + circle + MAP_LABEL_GAP + MAP_LABEL_HEIGHT // 2))
             self.screen.blit(diff_text, diff_rect)
         
         # Fancy legend panel
@@ -994,17 +967,20 @@ class DungeonCrawlerGame:
             self.screen.blit(legend_text, (85, y_pos - 10))
         
         # Instructions panel
-        inst_panel = pygame.Rect(SCREEN_WIDTH - 420, SCREEN_HEIGHT - 100, 400, 80)
+        inst_panel = pygame.Rect(SCREEN_WIDTH - 420, SCREEN_HEIGHT - 125, 400, 105)
         pygame.draw.rect(self.screen, LIGHT_ORANGE, inst_panel, border_radius=15)
         pygame.draw.rect(self.screen, PURPLE, inst_panel, 3, border_radius=15)
         
         inst_title = self.font.render("CONTROLS", True, PURPLE)
-        self.screen.blit(inst_title, (SCREEN_WIDTH - 400, SCREEN_HEIGHT - 90))
+        self.screen.blit(inst_title, (SCREEN_WIDTH - 400, SCREEN_HEIGHT - 115))
+        
+        inst_text0 = self.font.render("Wheel: zoom | Right drag / Arrows: pan", True, DARK_BLUE)
+        self.screen.blit(inst_text0, (SCREEN_WIDTH - 410, SCREEN_HEIGHT - 90))
         
         inst_text1 = self.font.render("Click on available dungeons to enter", True, DARK_BLUE)
         self.screen.blit(inst_text1, (SCREEN_WIDTH - 410, SCREEN_HEIGHT - 65))
         
-        inst_text2 = self.font.render("Press R to generate new map", True, DARK_BLUE)
+        inst_text2 = self.font.render("R: new map | F5: save | F9: load", True, DARK_BLUE)
         self.screen.blit(inst_text2, (SCREEN_WIDTH - 410, SCREEN_HEIGHT - 40))
     
     def draw_dungeon_view(self):
@@ -1014,95 +990,72 @@ class DungeonCrawlerGame:
         if self.dungeon_map is None:
             return
         
-        cell_size = 25
+        cell_size = CELL_SIZE
+        first_x, first_y, last_x, last_y = self.visible_tile_range()
+        draw_calls = 0
         
-        # Draw dungeon with better colors
-        for y, row in enumerate(self.dungeon_map):
-            for x, cell in enumerate(row):
+        # Draw dungeon with better colors, only the tiles inside the camera view
+        for y in range(first_y, last_y + 1):
+            row = self.dungeon_map[y]
+            screen_y = y * cell_size - self.camera_y
+            for x in range(first_x, last_x + 1):
+                cell = row[x]
                 screen_x = x * cell_size - self.camera_x
-                screen_y = y * cell_size - self.camera_y
                 
-                if -cell_size <= screen_x <= SCREEN_WIDTH and -cell_size <= screen_y <= SCREEN_HEIGHT:
-                    rect = pygame.Rect(screen_x, screen_y, cell_size, cell_size)
-                    
-                    if cell == CellType.WALL:
-                        pygame.draw.rect(self.screen, MEDIUM_GRAY, rect)
-                        pygame.draw.rect(self.screen, DARK_GRAY, rect, 1)
-                    elif cell == CellType.EMPTY:
-                        pygame.draw.rect(self.screen, CREAM, rect)
-                        pygame.draw.rect(self.screen, LIGHT_GRAY, rect, 1)
-                    elif cell == CellType.TREASURE:
-                        pygame.draw.rect(self.screen, CREAM, rect)
-                        pygame.draw.rect(self.screen, GOLD, rect.inflate(-6, -6))
-                        pygame.draw.rect(self.screen, YELLOW, rect.inflate(-10, -10))
-                        # Add sparkle effect
-                        center_x, center_y = rect.center
-                        pygame.draw.circle(self.screen, WHITE, (center_x, center_y), 3)
-                    elif cell == CellType.EXIT:
-                        pygame.draw.rect(self.screen, CREAM, rect)
-                        pygame.draw.rect(self.screen, LIGHT_GREEN, rect.inflate(-4, -4))
-                        pygame.draw.rect(self.screen, DARK_GREEN, rect.inflate(-8, -8))
-                        # Add exit arrow
-                        center_x, center_y = rect.center
-                        pygame.draw.polygon(self.screen, WHITE, [
-                            (center_x, center_y - 5),
-                            (center_x - 4, center_y + 3),
-                            (center_x + 4, center_y + 3)
-                        ])
-        
-        # Draw enemies with better styling
+                rect = pygame.Rect(screen_x, screen_y, cell_size, cell_size)
+                
+                if cell == CellType.WALL:
+                    pygame.draw.rect(self.screen, MEDIUM_GRAY, rect)
+                    pygame.draw.rect(self.screen, DARK_GRAY, rect, 1)
+                    draw_calls += 2
+                elif cell == CellType.EMPTY:
+                    pygame.draw.rect(self.screen, CREAM, rect)
+                    pygame.draw.rect(self.screen, LIGHT_GRAY, rect, 1)
+                    draw_calls += 2
+                elif cell == CellType.TREASURE:
+                    pygame.draw.rect(self.screen, CREAM, rect)
+                    pygame.draw.rect(self.screen, GOLD, rect.inflate(-6, -6))
+                    pygame.draw.rect(self.screen, YELLOW, rect.inflate(-10, -10))
+                    # Add sparkle effect
+                    center_x, center_y = rect.center
+                    pygame.draw.circle(self.screen, WHITE, (center_x, center_y), 3)
+                    draw_calls += 4
+                elif cell == CellType.EXIT:
+                    pygame.draw.rect(self.screen, CREAM, rect)
+                    pygame.draw.rect(self.screen, LIGHT_GREEN, rect.inflate(-4, -4))
+                    pygame.draw.rect(self.screen, DARK_GREEN, rect.inflate(-8, -8))
+                    # Add exit arrow
+                    center_x, center_y = rect.center
+                    pygame.draw.polygon(self.screen, WHITE, [
+                        (center_x, center_y - 5),
+                        (center_x - 4, center_y + 3),
+                        (center_x + 4, center_y + 3)
+                    ])
+                    draw_calls += 4
+        
+        # Enemies, projectiles and the player come from the sprite cache and go out in one batch
+        blits = []
         for enemy in self.enemies:
-            if enemy.alive:
+            if enemy.alive and first_x <= enemy.x <= last_x and first_y <= enemy.y <= last_y:
                 screen_x = enemy.x * cell_size - self.camera_x
                 screen_y = enemy.y * cell_size - self.camera_y
+                blits.append((self.sprites.enemy(enemy.color), (screen_x, screen_y)))
                 
-                if -cell_size <= screen_x <= SCREEN_WIDTH and -cell_size <= screen_y <= SCREEN_HEIGHT:
-                    center_x = screen_x + cell_size // 2
-                    center_y = screen_y + cell_size // 2
-                    
-                    # Enemy shadow
-                    pygame.draw.circle(self.screen, (100, 100, 100), 
-                                    (center_x + 2, center_y + 2), cell_size // 3 + 2)
-                    
-                    # Enemy body
-                    pygame.draw.circle(self.screen, enemy.color, 
-                                    (center_x, center_y), cell_size // 3)
-                    pygame.draw.circle(self.screen, WHITE, 
-                                    (center_x, center_y), cell_size // 3, 2)
-                    
-                    # Enemy eyes
-                    eye_size = 2
-                    pygame.draw.circle(self.screen, RED, 
-                                    (center_x - 3, center_y - 2), eye_size)
-                    pygame.draw.circle(self.screen, RED, 
-                                    (center_x + 3, center_y - 2), eye_size)
-                    
-                    # Health bar for stronger enemies  
-                    if enemy.max_health > 20:
-                        self.draw_health_bar_fancy(self.screen, screen_x, screen_y - 12, 
-                                                cell_size, 6, enemy.health, enemy.max_health, "")
+                # Health bar for stronger enemies
+                if enemy.max_health > 20:
+                    bar = self.sprites.health_bar(cell_size, 6, enemy.health, enemy.max_health)
+                    blits.append((bar, (screen_x - 6, screen_y - 12 - 6)))
         
-        self.draw_projectiles()
+        self.queue_projectile_sprites(blits)
         
-        # Draw player with better styling
         screen_x = self.player.x * cell_size - self.camera_x
         screen_y = self.player.y * cell_size - self.camera_y
-        center_x = screen_x + cell_size // 2
-        center_y = screen_y + cell_size // 2
-        
-        # Player shadow
-        pygame.draw.circle(self.screen, (100, 100, 100), 
-                        (center_x + 2, center_y + 2), cell_size // 3 + 2)
-        
-        # Player body
-        pygame.draw.circle(self.screen, DARK_BLUE, (center_x, center_y), cell_size // 3)
-        pygame.draw.circle(self.screen, LIGHT_BLUE, (center_x, center_y), cell_size // 3 - 2)
-        pygame.draw.circle(self.screen, WHITE, (center_x, center_y), cell_size // 3, 2)
+        blits.append((self.sprites.player(), (screen_x, screen_y)))
         
-        # Player face
-        pygame.draw.circle(self.screen, WHITE, (center_x - 2, center_y - 2), 1)
-        pygame.draw.circle(self.screen, WHITE, (center_x + 2, center_y - 2), 1)
-        pygame.draw.arc(self.screen, WHITE, (center_x - 3, center_y, 6, 4), 0, 3.14, 1)
+        drawn_rects = self.screen.blits(blits, doreturn=self.dirty_rect_mode)
+        telemetry.tick_counts[telemetry.DRAW_CALLS] += draw_calls + len(blits)
+        if self.dirty_rect_mode:
+            self.dirty_rects.add_all(drawn_rects)
         
         # Draw UI
         self.draw_dungeon_ui()
@@ -1111,6 +1064,14 @@ class DungeonCrawlerGame:
         # UI Panel background
         ui_panel = pygame.Rect(5, 5, 320, 140)
         pygame.draw.rect(self.screen, CREAM, ui_panel, border_radius=15)
+
+        # Only push the panel to the display when one of its counters changed
+        alive_enemies = sum(1 for e in self.enemies if e.alive)
+        ui_state = (self.player.health, self.player.max_health, self.player.level, self.player.experience,
+                    self.current_node.treasures_collected, alive_enemies)
+        if ui_state != self.last_ui_state:
+            self.last_ui_state = ui_state
+            self.dirty_rects.add(ui_panel)
         pygame.draw.rect(self.screen, DARK_BLUE, ui_panel, 3, border_radius=15)
         
         # Health bar
@@ -1144,7 +1105,6 @@ class DungeonCrawlerGame:
         self.screen.blit(dungeon_surface, (15, 80))
         
         # Progress info
-        alive_enemies = sum(1 for e in self.enemies if e.alive)
         progress_text = f"Treasures: {self.current_node.treasures_collected}/{self.current_node.total_treasures} | Enemies: {alive_enemies}"
         progress_surface = self.font.render(progress_text, True, DARK_BLUE)
         self.screen.blit(progress_surface, (15, 105))
@@ -1244,16 +1204,15 @@ class DungeonCrawlerGame:
         return abs(x1 - x2) + abs(y1 - y2)
     
     def handle_joystick_motion(self):
-        if not self.joystick:
+        if self.joystick_axes is None:
             return
 
-        current_time = pygame.time.get_ticks()
+        current_time = self.ticks
         if current_time - self.last_joystick_move_time < self.joystick_move_cooldown:
             return  # still cooling down
 
         threshold = 0.5
-        axis_x = self.joystick.get_axis(0)
-        axis_y = self.joystick.get_axis(1)
+        axis_x, axis_y = self.joystick_axes
 
         dx, dy = 0, 0
         if axis_x < -threshold:
@@ -1276,9 +1235,7 @@ class DungeonCrawlerGame:
             self.shoot_projectile()
         elif button == 1:  # Circle / B (return to map)
             if self.game_state == GameState.DUNGEON:
-                pygame.mixer.music.stop()
-                pygame.mixer.music.load(self.sounds["map_music"])
-                pygame.mixer.music.play(-1, start=self.map_music_pos / 1000.0)
+                self.audio.play_music("map")
                 self.game_state = GameState.MAP_VIEW
 
     def handle_map_input_from_joystick(self, button):
@@ -1290,7 +1247,7 @@ class DungeonCrawlerGame:
         if dx == 0 and dy == 0:
             return  # no direction pressed
 
-        current_time = pygame.time.get_ticks()
+        current_time = self.ticks
         if current_time - self.last_joystick_move_time < self.joystick_move_cooldown:
             return  # cooldown delay
 
@@ -1305,54 +1262,120 @@ class DungeonCrawlerGame:
             moved = self.player.move(0, -1, self.dungeon_map, self.enemies)
             if moved:
                 self.last_direction = (0, -1)
-                self.last_joystick_move_time = pygame.time.get_ticks()
+                self.last_joystick_move_time = self.ticks
 
         elif button == 12:  # D-Pad Down
             moved = self.player.move(0, 1, self.dungeon_map, self.enemies)
             if moved:
                 self.last_direction = (0, 1)
-                self.last_joystick_move_time = pygame.time.get_ticks()
+                self.last_joystick_move_time = self.ticks
 
         elif button == 13:  # D-Pad Left
             moved = self.player.move(-1, 0, self.dungeon_map, self.enemies)
             if moved:
                 self.last_direction = (-1, 0)
-                self.last_joystick_move_time = pygame.time.get_ticks()
+                self.last_joystick_move_time = self.ticks
 
         elif button == 14:  # D-Pad Right
             moved = self.player.move(1, 0, self.dungeon_map, self.enemies)
             if moved:
                 self.last_direction = (1, 0)
-                self.last_joystick_move_time = pygame.time.get_ticks()
+                self.last_joystick_move_time = self.ticks
 
         elif button == 0:  # X / A (shoot)
             self.shoot_projectile()
 
         elif button == 1:  # Circle / B (return to map)
-            pygame.mixer.music.stop()
-            pygame.mixer.music.load(self.sounds["map_music"])
-            pygame.mixer.music.play(-1, start=self.map_music_pos / 1000.0)
+            self.audio.play_music("map")
             self.game_state = GameState.MAP_VIEW
 
     def run(self):
         running = True
         
         while running:
+            if self.late_latch:
+                self.wait_for_latch()
+            work_start = time.perf_counter()
             running = self.handle_events()
             self.update_game()
-            
-            # Draw based on game state
-            if self.game_state == GameState.MAP_VIEW:
-                self.draw_map_view()
-            elif self.game_state == GameState.DUNGEON:
-                self.draw_dungeon_view()
-            elif self.game_state == GameState.VICTORY:
-                self.draw_victory_screen()
-            elif self.game_state == GameState.GAME_OVER:
-                self.draw_game_over_screen()
-            
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            self.draw_frame()
+            work_end = time.perf_counter()
+            self.record_telemetry(work_end - work_start)
+            self.present_frame()
+            if self.latency_monitor is not None:
+                self.latency_monitor.frame_presented()
+            if self.on_first_frame is not None:
+                callback, self.on_first_frame = self.on_first_frame, None
+                callback()
+
+            if self.late_latch:
+                elapsed = self.frame_presented_late(work_end - work_start)
+            else:
+                elapsed = self.clock.tick(FPS)
+            self.audio.update(elapsed)
         
         pygame.quit()
         sys.exit()
+
+    def wait_for_latch(self):
+        # Late latching: sleep first, then read input with only enough of the frame left
+        # for update + draw. The classic loop reads input right after the previous present
+        # and sleeps afterwards, so with vsync the input is up to a frame old on screen.
+        now = time.perf_counter()
+        if self.present_deadline is None:
+            self.present_deadline = now + 1 / FPS
+        wake = self.present_deadline - self.work_estimate - LATE_LATCH_MARGIN_MS / 1000
+        if wake > now:
+            time.sleep(wake - now)
+
+    def frame_presented_late(self, work): # Schedule the next deadline, returns ms since the last present
+        # Track the slowest recent frames so spikes don't make us miss the deadline,
+        # decaying so one hitch doesn't pull input early for long
+        self.work_estimate = max(work, self.work_estimate * 0.95)
+
+        now = time.perf_counter()
+        # With vsync the flip returns at the refresh, so anchor to it; otherwise keep the cadence
+        self.present_deadline = max(self.present_deadline, now) + 1 / FPS
+        elapsed = (now - self.last_present) * 1000 if self.last_present is not None else 0
+        self.last_present = now
+        return elapsed
+
+    def draw_frame(self):
+        # Draw based on game state
+        if self.game_state == GameState.MAP_VIEW:
+            self.draw_map_view()
+        elif self.game_state == GameState.DUNGEON:
+            self.draw_dungeon_view()
+        elif self.game_state == GameState.VICTORY:
+            self.draw_victory_screen()
+        elif self.game_state == GameState.GAME_OVER:
+            self.draw_game_over_screen()
+
+    def record_telemetry(self, work_seconds): # Close the tick's counters, gauges are only sampled while recording
+        recorder = self.telemetry
+        if recorder.enabled:
+            counts = telemetry.tick_counts
+            counts[telemetry.FRAME_US] = int(work_seconds * 1000000)
+            counts[telemetry.PROJECTILES] = len(self.projectiles)
+            counts[telemetry.ENEMY_PROJECTILES] = len(self.enemy_projectiles)
+            if self.game_state == GameState.DUNGEON:
+                chasing = patrolling = 0
+                for enemy in self.enemies:
+                    if enemy.alive:
+                        if abs(enemy.x - self.player.x) + abs(enemy.y - self.player.y) <= ENEMY_DETECTION_RANGE:
+                            chasing += 1
+                        else:
+                            patrolling += 1
+                counts[telemetry.ENEMIES_CHASING] = chasing
+                counts[telemetry.ENEMIES_PATROLLING] = patrolling
+        # Synced every tick so turning recording on does not report everything since it was off
+        recorder.add_total(telemetry.SPRITE_CACHE_HITS, self.sprites.hits)
+        recorder.add_total(telemetry.SPRITE_CACHE_MISSES, self.sprites.misses)
+        recorder.end_tick()
+
+    def present_frame(self):
+        if self.dirty_rect_mode and self.game_state == GameState.DUNGEON:
+            self.dirty_rects.present((self.current_node.id, self.camera_x, self.camera_y))
+        else:
+            self.dirty_rects.invalidate()
+            pygame.display.flip()
@@ -0,0 +1,90 @@
+class GridMask:
+    # Sets of grid cells as single Python ints: cell (x, y) is bit y * stride + x. Rows are
+    # width + 1 bits apart and the spare bit is kept clear, so shifting by 1 moves cells
+    # left/right without wrapping into the next row, and shifting by stride moves them
+    # up/down. Whole-map operations (neighbour tests, flood fills) then cost a handful of
+    # big-int operations instead of a Python loop over every cell.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.stride = width + 1
+        row = (1 << width) - 1
+        self.full = 0  # Every real cell, guard bits clear
+        for y in range(height):
+            self.full |= row << (y * self.stride)
+
+    def bit(self, x, y):
+        return 1 << (y * self.stride + x)
+
+    def from_map(self, dungeon_map, cell_types): # Cells whose type is in cell_types
+        bits = 0
+        stride = self.stride
+        for y, row in enumerate(dungeon_map):
+            row_bits = 0
+            for x, cell in enumerate(row):
+                if cell in cell_types:
+                    row_bits |= 1 << x
+            bits |= row_bits << (y * stride)
+        return bits
+
+    def interior(self): # Cells not on the outer border
+        bits = 0
+        row = ((1 << (self.width - 2)) - 1) << 1 if self.width > 2 else 0
+        for y in range(1, self.height - 1):
+            bits |= row << (y * self.stride)
+        return bits
+
+    def shifted(self, bits): # The set moved one cell right, left, down and up
+        full, stride = self.full, self.stride
+        return ((bits << 1) & full, (bits >> 1) & full, (bits << stride) & full, bits >> stride)
+
+    def moved(self, bits, dx, dy): # The set moved by (dx, dy), cells leaving the grid are dropped
+        offset = dx + dy * self.stride
+        return ((bits << offset) if offset >= 0 else (bits >> -offset)) & self.full
+
+    def dilate(self, bits): # bits plus their 4-neighbours
+        right, left, down, up = self.shifted(bits)
+        return bits | right | left | down | up
+
+    def neighbor_count_at_least(self, bits, count): # Cells with at least count of their 4 neighbours in bits
+        # Bit-sliced counter: for every cell at once, ones/twos/fours hold its neighbour count
+        ones = twos = fours = 0
+        for shifted in self.shifted(bits):
+            carry = ones & shifted
+            ones ^= shifted
+            fours |= twos & carry
+            twos ^= carry
+        if count <= 0:
+            return self.full
+        if count == 1:
+            return ones | twos | fours
+        if count == 2:
+            return twos | fours
+        if count == 3:
+            return (twos & ones) | fours
+        return fours if count == 4 else 0
+
+    def reachable(self, walkable, start): # Flood fill: cells of walkable connected to the start bits
+        region = start & walkable
+        frontier = region
+        while frontier:
+            grown = self.dilate(frontier) & walkable & ~region
+            region |= grown
+            frontier = grown
+        return region
+
+    def cells(self, bits): # (x, y) of every set bit in row-major order
+        stride = self.stride
+        text = bin(bits)[:1:-1]  # Lowest bit first
+        index = text.find("1")
+        cells = []
+        while index >= 0:
+            cells.append((index % stride, index // stride))
+            index = text.find("1", index + 1)
+        return cells
+
+    def first(self, bits): # (x, y) of the lowest set bit in row-major order, None if empty
+        if not bits:
+            return None
+        index = (bits & -bits).bit_length() - 1
+        return (index % self.stride, index // self.stride)
@@ -0,0 +1,58 @@
+import time
+from collections import deque
+
+from constants import *
+
+class LatencyMonitor:
+    # Input-to-display latency. A frame that polled input is stamped at poll time and
+    # closed when that frame is presented, which is the first frame that can show the
+    # result. Events may have sat in the SDL queue since the previous poll, so the time
+    # between polls is kept too: it bounds how long an event waited before being read.
+    def __init__(self, samples=LATENCY_SAMPLES, report_interval=LATENCY_REPORT_FRAMES):
+        self.samples = deque(maxlen=samples)  # (poll_to_present_ms, queue_bound_ms)
+        self.report_interval = report_interval
+        self.pending = None
+        self.last_poll = None
+        self.frames = 0
+
+    def input_polled(self, has_input):
+        now = time.perf_counter()
+        queue_bound = now - self.last_poll if self.last_poll is not None else 0.0
+        self.last_poll = now
+        if has_input and self.pending is None:
+            self.pending = (now, queue_bound)
+
+    def frame_presented(self):
+        now = time.perf_counter()
+        if self.pending is not None:
+            poll_time, queue_bound = self.pending
+            self.samples.append(((now - poll_time) * 1000, queue_bound * 1000))
+            self.pending = None
+
+        self.frames += 1
+        if self.report_interval and self.frames % self.report_interval == 0 and self.samples:
+            self.report()
+
+    def summary(self):
+        if not self.samples:
+            return None
+        present = sorted(sample[0] for sample in self.samples)
+        # Events arrive at random points while waiting, on average half the bound
+        estimated = sorted(sample[0] + sample[1] / 2 for sample in self.samples)
+        worst = max(sample[0] + sample[1] for sample in self.samples)
+        return {
+            "inputs": len(present),
+            "poll_to_present_mean": sum(present) / len(present),
+            "poll_to_present_p95": present[min(len(present) - 1, int(len(present) * 0.95))],
+            "estimated_mean": sum(estimated) / len(estimated),
+            "estimated_p95": estimated[min(len(estimated) - 1, int(len(estimated) * 0.95))],
+            "worst_case": worst,
+        }
+
+    def report(self):
+        stats = self.summary()
+        if stats is None:
+            return
+        print(f"Input latency over {stats['inputs']} inputs: poll->present mean {stats['poll_to_present_mean']:.1f} ms"
+              f" p95 {stats['poll_to_present_p95']:.1f} ms | with queue wait mean {stats['estimated_mean']:.1f} ms"
+              f" p95 {stats['estimated_p95']:.1f} ms worst {stats['worst_case']:.1f} ms")
@@ -0,0 +1,160 @@
+from collections import defaultdict
+
+from constants import *
+
+class FenwickTree: # Prefix sums over positions 0..size-1, used for inversion counting
+    def __init__(self, size):
+        self.tree = [0] * (size + 1)
+
+    def add(self, index, value=1):
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += value
+            index += index & -index
+
+    def prefix_sum(self, index): # Sum of positions 0..index-1
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+def count_crossings(edges, lower_width):
+    # edges are (upper_position, lower_position) pairs between two adjacent layers.
+    # Two edges cross when their upper ends and lower ends are in opposite order,
+    # so this is an inversion count over the lower ends: O(E log V).
+    tree = FenwickTree(lower_width)
+    crossings = 0
+    inserted = 0
+    for _, lower in sorted(edges):
+        crossings += inserted - tree.prefix_sum(lower + 1)
+        tree.add(lower)
+        inserted += 1
+    return crossings
+
+class LayeredLayout:
+    # Sugiyama-style layout for the world map:
+    #   1. layers from DAGManager.compute_depths (Kahn),
+    #   2. edges spanning several layers are split with dummy nodes,
+    #   3. barycenter ordering sweeps down and up, keeping the order with fewest crossings,
+    #   4. coordinate assignment.
+    # Each sweep is O(E log V) including the crossing count.
+    def __init__(self, dag_manager, sweeps=LAYOUT_SWEEPS):
+        self.dag_manager = dag_manager
+        self.sweeps = sweeps
+
+    def build_layers(self):
+        depths = self.dag_manager.compute_depths()
+        max_depth = max(depths.values()) if depths else 0
+        layers = [[] for _ in range(max_depth + 1)]
+        for node_id in self.dag_manager.nodes:
+            layers[depths[node_id]].append(node_id)
+
+        up = defaultdict(list)  # neighbours one layer above
+        down = defaultdict(list)  # neighbours one layer below
+        for from_id, to_ids in self.dag_manager.adjacency_list.items():
+            for to_id in to_ids:
+                previous = from_id
+                for depth in range(depths[from_id] + 1, depths[to_id]):
+                    dummy = ("dummy", from_id, to_id, depth)
+                    layers[depth].append(dummy)
+                    down[previous].append(dummy)
+                    up[dummy].append(previous)
+                    previous = dummy
+                down[previous].append(to_id)
+                up[to_id].append(previous)
+
+        return layers, up, down
+
+    def total_crossings(self, layers, down, position):
+        crossings = 0
+        for depth in range(len(layers) - 1):
+            edges = [(position[node], position[below]) for node in layers[depth] for below in down[node]]
+            crossings += count_crossings(edges, len(layers[depth + 1]))
+        return crossings
+
+    def reorder(self, layer, neighbours, position):
+        # Barycenter of the fixed neighbouring layer, nodes without neighbours keep their slot
+        keys = {}
+        for node in layer:
+            linked = neighbours[node]
+            if linked:
+                keys[node] = sum(position[other] for other in linked) / len(linked)
+            else:
+                keys[node] = position[node]
+        layer.sort(key=keys.__getitem__)
+        for index, node in enumerate(layer):
+            position[node] = index
+
+    def order_layers(self, layers, up, down):
+        position = {node: index for layer in layers for index, node in enumerate(layer)}
+        best_orders = [list(layer) for layer in layers]
+        best_crossings = self.total_crossings(layers, down, position)
+
+        for _ in range(self.sweeps):
+            if best_crossings == 0:
+                break
+            for depth in range(1, len(layers)):
+                self.reorder(layers[depth], up, position)
+            for depth in range(len(layers) - 2, -1, -1):
+                self.reorder(layers[depth], down, position)
+
+            crossings = self.total_crossings(layers, down, position)
+            if crossings < best_crossings:
+                best_crossings = crossings
+                best_orders = [list(layer) for layer in layers]
+
+        self.crossings = best_crossings
+        return best_orders
+
+    def assign_coordinates(self, layers, up):
+        positions = {}
+        vertical_spacing = max(MAP_MIN_LAYER_SPACING, (SCREEN_HEIGHT - 250) / len(layers))
+        widest = max(len(layer) for layer in layers)
+        fits_screen = widest <= 1 or (SCREEN_WIDTH - 240) / (widest - 1) >= MAP_NODE_SPACING
+
+        for depth, layer in enumerate(layers):
+            y = 200 + depth * vertical_spacing
+
+            if fits_screen:
+                # Small worlds keep the classic spread across the screen width
+                if len(layer) == 1:
+                    xs = [SCREEN_WIDTH // 2]
+                elif len(layer) == 2:
+                    xs = [SCREEN_WIDTH // 3, 2 * SCREEN_WIDTH // 3]
+                else:
+                    margin = 120
+                    spacing = (SCREEN_WIDTH - 2 * margin) / (len(layer) - 1)
+                    xs = [margin + i * spacing for i in range(len(layer))]
+            elif depth == 0:
+                start = SCREEN_WIDTH / 2 - (len(layer) - 1) * MAP_NODE_SPACING / 2
+                xs = [start + i * MAP_NODE_SPACING for i in range(len(layer))]
+            else:
+                # Pull every node under the average of its parents, then push right to keep
+                # the minimum spacing and shift the layer back so it stays centered on them
+                desired = []
+                for index, node in enumerate(layer):
+                    parents = up[node]
+                    if parents:
+                        desired.append(sum(positions[parent][0] for parent in parents) / len(parents))
+                    else:
+                        desired.append(desired[-1] + MAP_NODE_SPACING if desired else SCREEN_WIDTH / 2)
+                xs = []
+                for x in desired:
+                    xs.append(max(x, xs[-1] + MAP_NODE_SPACING) if xs else x)
+                shift = (sum(desired) - sum(xs)) / len(xs)
+                xs = [x + shift for x in xs]
+
+            for node, x in zip(layer, xs):
+                positions[node] = (x, y)
+
+        return positions
+
+    def compute(self): # node id -> (x, y) world map position
+        layers, up, down = self.build_layers()
+        if not layers or not layers[0]:
+            return {}
+
+        layers = self.order_layers(layers, up, down)
+        positions = self.assign_coordinates(layers, up)
+        return {node_id: positions[node_id] for node_id in self.dag_manager.nodes}
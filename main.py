@@ -1,19 +1,80 @@
-import pygame
+import time
+START_TIME = time.perf_counter()  # Taken before anything else is imported, for the startup report
+
 import sys
 import random
-from enum import Enum
-from collections import defaultdict, deque
-from heapq import heappush, heappop
-import math
-import pygame.mixer
-import os
+import argparse
 
-from game import DungeonCrawlerGame
+from startup import StartupTimer
 
-# Initialize Pygame
-pygame.init()
+# Pure Python game model first, then SDL and the presentation layer
+CORE_MODULES = ["constants", "dungeon", "dag_manager", "entities", "world_generator", "layout"]
+PRESENTATION_MODULES = ["pygame", "game"]
 
 # Run the game
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dungeon Crawler - DAG Level System")
+    parser.add_argument("--record", metavar="PATH", help="record seed and inputs for replay.py")
+    parser.add_argument("--seed", type=int, help="seed for the random generators")
+    parser.add_argument("--late-latch", action="store_true", help="sleep before reading input instead of after presenting")
+    parser.add_argument("--latency", action="store_true", help="measure and periodically print input-to-display latency")
+    parser.add_argument("--telemetry", metavar="PATH",
+                        help="record per-tick counters from the start and write them here on exit (.csv or binary)")
+    parser.add_argument("--startup-report", action="store_true", help="print a startup time breakdown after the first frame")
+    parser.add_argument("--startup-check", action="store_true",
+                        help="exit after the first frame, with status 1 if it missed STARTUP_BUDGET_MS")
+    args = parser.parse_args()
+
+    timer = StartupTimer(START_TIME)
+    timer.mark("interpreter and main")
+    for name in CORE_MODULES:
+        timer.timed_import(name)
+    for name in PRESENTATION_MODULES:
+        timer.timed_import(name)
+
+    import pygame
+    from constants import STARTUP_BUDGET_MS, TELEMETRY_FILE
+    from game import DungeonCrawlerGame
+
+    # Initialize Pygame
+    pygame.init()
+    timer.mark("pygame.init")
+
+    # The seed has to be in place before the game builds its first world
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    random.seed(seed)
+
     game = DungeonCrawlerGame()
-    game.run()
+    timer.mark("game setup")
+
+    if args.startup_report or args.startup_check:
+        def first_frame():
+            timer.mark("first frame")
+            within = timer.report(STARTUP_BUDGET_MS)
+            if args.startup_check:
+                pygame.quit()
+                sys.exit(0 if within else 1)
+        game.on_first_frame = first_frame
+
+    if args.late_latch:
+        game.late_latch = True
+    if args.latency:
+        from latency import LatencyMonitor
+        game.latency_monitor = LatencyMonitor()
+
+    if args.telemetry:
+        game.telemetry.enabled = True
+    if args.record:
+        from replay import InputRecorder
+        game.input_recorder = InputRecorder(args.record, seed)
+    try:
+        game.run()
+    finally:
+        if game.input_recorder is not None:
+            game.input_recorder.close()
+        if game.latency_monitor is not None:
+            game.latency_monitor.report()
+        if args.telemetry or game.telemetry.count:
+            game.telemetry.export(args.telemetry or TELEMETRY_FILE)
+        if game.path_service is not None:
+            game.path_service.close()  # Unlinks the shared map blocks
@@ -0,0 +1,100 @@
+import math
+from collections import defaultdict
+
+from constants import *
+
+class MapCamera: # Zoom and pan for the world map, world coordinates are the layout positions
+    def __init__(self):
+        self.zoom = 1.0
+        self.offset_x = 0.0  # world position shown at the screen's top-left corner
+        self.offset_y = 0.0
+
+    def reset(self):
+        self.zoom = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+    def world_to_screen(self, x, y):
+        return ((x - self.offset_x) * self.zoom, (y - self.offset_y) * self.zoom)
+
+    def screen_to_world(self, x, y):
+        return (x / self.zoom + self.offset_x, y / self.zoom + self.offset_y)
+
+    def pan(self, dx, dy): # Move the view by a screen-space delta
+        self.offset_x -= dx / self.zoom
+        self.offset_y -= dy / self.zoom
+
+    def zoom_at(self, factor, screen_pos): # Zoom keeping the world point under screen_pos in place
+        world_x, world_y = self.screen_to_world(*screen_pos)
+        self.zoom = max(MAP_MIN_ZOOM, min(MAP_MAX_ZOOM, self.zoom * factor))
+        self.offset_x = world_x - screen_pos[0] / self.zoom
+        self.offset_y = world_y - screen_pos[1] / self.zoom
+
+    def visible_world_rect(self):
+        min_x, min_y = self.screen_to_world(0, 0)
+        max_x, max_y = self.screen_to_world(SCREEN_WIDTH, SCREEN_HEIGHT)
+        return min_x, min_y, max_x, max_y
+
+class SpatialGrid:
+    # Uniform grid of buckets over world space. Items are registered in every bucket
+    # their shape touches, so a point or rectangle query only looks at a few buckets
+    # regardless of how many items the map has.
+    def __init__(self, cell_size=MAP_GRID_CELL):
+        self.cell_size = cell_size
+        self.buckets = defaultdict(list)
+
+    def cell(self, x, y):
+        return (int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size)))
+
+    def insert_rect(self, item, min_x, min_y, max_x, max_y):
+        first_x, first_y = self.cell(min_x, min_y)
+        last_x, last_y = self.cell(max_x, max_y)
+        for cy in range(first_y, last_y + 1):
+            for cx in range(first_x, last_x + 1):
+                self.buckets[(cx, cy)].append(item)
+
+    def insert_segment(self, item, start, end):
+        # Amanatides & Woo walk over the buckets, so long edges only occupy the buckets
+        # they actually pass through instead of their whole bounding box. Every bucket the
+        # segment touches is visited; where it passes exactly through a bucket corner both
+        # side buckets are added as well (supercover), so culling never drops a visible edge.
+        size = self.cell_size
+        x, y = start
+        dx, dy = end[0] - x, end[1] - y
+        cx, cy = self.cell(x, y)
+        last_x, last_y = self.cell(*end)
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        # Segment parameter t in [0, 1] at the next vertical / horizontal bucket line, and between lines
+        next_x = ((cx + (dx > 0)) * size - x) / dx if dx else math.inf
+        next_y = ((cy + (dy > 0)) * size - y) / dy if dy else math.inf
+        delta_x = size / abs(dx) if dx else math.inf
+        delta_y = size / abs(dy) if dy else math.inf
+
+        cells = [(cx, cy)]
+        for _ in range(abs(last_x - cx) + abs(last_y - cy)):
+            if next_x == next_y:
+                cells.append((cx + step_x, cy))
+                cells.append((cx, cy + step_y))
+            if next_x <= next_y:
+                cx += step_x
+                next_x += delta_x
+            else:
+                cy += step_y
+                next_y += delta_y
+            cells.append((cx, cy))
+        for cell in dict.fromkeys(cells):
+            self.buckets[cell].append(item)
+
+    def query_rect(self, min_x, min_y, max_x, max_y): # Items in buckets overlapping the rect, in insertion order per bucket
+        first_x, first_y = self.cell(min_x, min_y)
+        last_x, last_y = self.cell(max_x, max_y)
+        found = {}
+        for cy in range(first_y, last_y + 1):
+            for cx in range(first_x, last_x + 1):
+                for item in self.buckets.get((cx, cy), ()):
+                    found[item] = True
+        return list(found)
+
+    def query_point(self, x, y, radius):
+        return self.query_rect(x - radius, y - radius, x + radius, y + radius)
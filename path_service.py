@@ -0,0 +1,106 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import telemetry
+from constants import *
+from pathfinding import find_path_on_grid
+
+# Worker side: shared grids this process has attached, by block name. Only the newest
+# block is kept open, the parent retires a block once its map is replaced.
+attached_grids = {}
+
+def attach_grid(name):
+    grid = attached_grids.get(name)
+    if grid is None:
+        for old in attached_grids.values():
+            old.close()
+        attached_grids.clear()
+        grid = attached_grids[name] = shared_memory.SharedMemory(name=name)
+    return grid
+
+def solve_batch(name, width, height, version, requests): # Pool entry point, returns (version, [(start, goal, path)])
+    walkable = attach_grid(name).buf  # Read in place, the map is never copied into the worker
+    return version, [(start, goal, find_path_on_grid(start, goal, walkable, width, height))
+                     for start, goal in requests]
+
+class PathService:
+    # Enemy pathfinding on worker processes. The current dungeon's walkability lives in a
+    # shared memory block the workers read directly. Requests collected during a tick go out
+    # as one batch per worker on submit(), and collect() at the start of the next tick makes
+    # the answers available through path(). Every answer carries the map version it was
+    # computed for; answers for a replaced map are dropped. path() returns None for anything
+    # not answered yet, callers then search on the main thread as before.
+    def __init__(self, workers=PATH_SERVICE_WORKERS):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.grid = None
+        self.width = 0
+        self.height = 0
+        self.version = 0
+        self.retired = []  # (version, block) of replaced maps, unlinked once no batch uses them
+        self.requests = set()
+        self.pending = []  # (version, future)
+        self.paths = {}  # (start, goal) -> path, answers for the current tick
+        self.answered = 0
+        self.stale = 0
+
+    def set_map(self, dungeon_map): # New dungeon, None disables the service until the next map
+        if self.grid is not None:
+            self.retired.append((self.version, self.grid))
+            self.grid = None
+        self.version += 1
+        self.requests.clear()
+        self.paths.clear()
+        if dungeon_map is None:
+            return
+
+        self.height = len(dungeon_map)
+        self.width = len(dungeon_map[0])
+        self.grid = shared_memory.SharedMemory(create=True, size=self.width * self.height)
+        self.grid.buf[:self.width * self.height] = bytes(cell != CellType.WALL for row in dungeon_map for cell in row)
+
+    def request(self, start, goal):
+        if self.grid is not None and start != goal:
+            self.requests.add((start, goal))
+
+    def submit(self): # Send this tick's requests, split evenly over the workers
+        if not self.requests:
+            return
+        requests = sorted(self.requests)
+        self.requests.clear()
+        batches = min(self.workers, len(requests))
+        for index in range(batches):
+            future = self.pool.submit(solve_batch, self.grid.name, self.width, self.height,
+                                      self.version, requests[index::batches])
+            self.pending.append((self.version, future))
+
+    def collect(self): # Apply finished batches, call once at the start of a tick
+        self.paths.clear()
+        still_pending = []
+        for version, future in self.pending:
+            if not future.done():
+                still_pending.append((version, future))
+            elif version != self.version or future.exception() is not None:
+                self.stale += 1
+            else:
+                _, results = future.result()
+                for start, goal, path in results:
+                    self.paths[(start, goal)] = path
+                self.answered += len(results)
+                telemetry.tick_counts[telemetry.ENEMY_PATHS] += len(results)
+        self.pending = still_pending
+
+        in_use = {version for version, _ in self.pending}
+        for version, grid in [entry for entry in self.retired if entry[0] not in in_use]:
+            grid.close()
+            grid.unlink()
+        self.retired = [entry for entry in self.retired if entry[0] in in_use]
+
+    def path(self, start, goal): # Worker answer for this exact search, or None
+        return self.paths.get((start, goal))
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.pending = []
+        self.set_map(None)
+        self.collect()
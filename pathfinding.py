@@ -0,0 +1,307 @@
+from array import array
+from heapq import heappush, heappop
+
+import telemetry
+from constants import *
+from grid_mask import GridMask
+
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]  # Down, Up, Right, Left
+INFINITY = float("inf")
+
+def manhattan(a, b): # Manhattan Heuristic Distance
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+def find_path(start, goal, dungeon_map): # A* over non-wall cells, path excludes start and ends at goal
+    if start == goal:
+        return []
+    
+    open_set = []
+    heappush(open_set, (0, start))
+    came_from = {}
+    g_score = {start: 0}
+    f_score = {start: manhattan(start, goal)}
+    width = len(dungeon_map[0])
+    height = len(dungeon_map)
+    expanded = 0
+    
+    while open_set:
+        current = heappop(open_set)[1]
+        expanded += 1
+        
+        if current == goal:
+            telemetry.tick_counts[telemetry.PATH_EXPANSIONS] += expanded
+            # Reconstruct path
+            path = []
+            while current in came_from:
+                path.append(current)
+                current = came_from[current]
+            return path[::-1]  # Reverse to get path from start to goal
+        
+        for dx, dy in DIRECTIONS:
+            neighbor = (current[0] + dx, current[1] + dy)
+            nx, ny = neighbor
+            
+            # Check bounds and walls
+            if (0 <= nx < width and 
+                0 <= ny < height and 
+                dungeon_map[ny][nx] != CellType.WALL):
+                
+                tentative_g_score = g_score[current] + 1
+                
+                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    f_score[neighbor] = tentative_g_score + manhattan(neighbor, goal)
+                    heappush(open_set, (f_score[neighbor], neighbor))
+    
+    telemetry.tick_counts[telemetry.PATH_EXPANSIONS] += expanded
+    return []  # No path found
+
+def find_path_on_grid(start, goal, walkable, width, height):
+    # find_path over a flat row-major grid of 1 (walkable) / 0 (wall) bytes, such as a
+    # shared memory buffer, so worker processes can search without a copy of the map
+    if start == goal:
+        return []
+
+    open_set = []
+    heappush(open_set, (0, start))
+    came_from = {}
+    g_score = {start: 0}
+
+    while open_set:
+        current = heappop(open_set)[1]
+
+        if current == goal:
+            path = []
+            while current in came_from:
+                path.append(current)
+                current = came_from[current]
+            return path[::-1]
+
+        for dx, dy in DIRECTIONS:
+            nx, ny = current[0] + dx, current[1] + dy
+            if 0 <= nx < width and 0 <= ny < height and walkable[ny * width + nx]:
+                neighbor = (nx, ny)
+                tentative_g_score = g_score[current] + 1
+                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    heappush(open_set, (tentative_g_score + manhattan(neighbor, goal), neighbor))
+
+    return []
+
+class DStarLite:
+    # Incremental search for one chasing enemy (Koenig & Likhachev's D* Lite). The search
+    # runs backwards from the player, so its g values are distances to the player and stay
+    # valid while the enemy moves: a step of the enemy only bumps km, and replanning after
+    # it usually expands nothing. Wall changes are repaired through cell_changed.
+    # When the player moves the search starts over instead: every g value shifts, and
+    # repairing them was measured to expand more cells than a fresh backward search.
+    def __init__(self, dungeon_map, start, goal):
+        self.dungeon_map = dungeon_map
+        self.width = len(dungeon_map[0])
+        self.height = len(dungeon_map)
+        self.expansions = 0
+        self.reset(start, goal)
+
+    def reset(self, start, goal):
+        self.start = start
+        self.last = start
+        self.goal = goal
+        self.km = 0
+        self.g = {}
+        self.rhs = {goal: 0}
+        self.queue = []
+        self.queued = {goal: self.key(goal)}  # cell -> its live key, older heap entries are skipped
+        heappush(self.queue, (self.queued[goal], goal))
+
+    def key(self, cell):
+        best = min(self.g.get(cell, INFINITY), self.rhs.get(cell, INFINITY))
+        return (best + manhattan(self.start, cell) + self.km, best)
+
+    def neighbors(self, cell):
+        x, y = cell
+        dungeon_map = self.dungeon_map
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < self.width and 0 <= ny < self.height and dungeon_map[ny][nx] != CellType.WALL:
+                yield (nx, ny)
+
+    def update_vertex(self, cell):
+        if cell != self.goal:
+            g = self.g
+            if self.dungeon_map[cell[1]][cell[0]] == CellType.WALL:
+                self.rhs[cell] = INFINITY
+            else:
+                self.rhs[cell] = min((g.get(n, INFINITY) + 1 for n in self.neighbors(cell)), default=INFINITY)
+        if self.g.get(cell, INFINITY) != self.rhs.get(cell, INFINITY):
+            key = self.key(cell)
+            self.queued[cell] = key
+            heappush(self.queue, (key, cell))
+        else:
+            self.queued.pop(cell, None)
+
+    def compute_shortest_path(self):
+        queue, queued, g, rhs = self.queue, self.queued, self.g, self.rhs
+        start = self.start
+        expansions = self.expansions
+        while queue:
+            key, cell = queue[0]
+            if queued.get(cell) != key:
+                heappop(queue)  # Superseded entry
+                continue
+            if key >= self.key(start) and rhs.get(start, INFINITY) == g.get(start, INFINITY):
+                break
+            heappop(queue)
+            self.expansions += 1
+
+            new_key = self.key(cell)
+            if key < new_key:
+                queued[cell] = new_key
+                heappush(queue, (new_key, cell))
+            elif g.get(cell, INFINITY) > rhs.get(cell, INFINITY):
+                g[cell] = rhs[cell]
+                del queued[cell]
+                for n in self.neighbors(cell):
+                    self.update_vertex(n)
+            else:
+                g[cell] = INFINITY
+                self.update_vertex(cell)
+                for n in self.neighbors(cell):
+                    self.update_vertex(n)
+        telemetry.tick_counts[telemetry.PATH_EXPANSIONS] += self.expansions - expansions
+
+    def cell_changed(self, cell): # A cell became a wall or was opened up
+        self.update_vertex(cell)
+        for n in self.neighbors(cell):
+            self.update_vertex(n)
+
+    def plan(self, start, goal): # Same contract as find_path(start, goal, dungeon_map)
+        if goal != self.goal:
+            self.reset(start, goal)
+        elif start != self.start:
+            self.km += manhattan(self.last, start)
+            self.last = self.start = start
+        self.compute_shortest_path()
+
+        # Walk down the g values, first neighbour in DIRECTIONS order wins ties
+        path = []
+        cell = start
+        g = self.g
+        while cell != goal:
+            cell = min(self.neighbors(cell), key=lambda n: g.get(n, INFINITY), default=None)
+            if cell is None or g.get(cell, INFINITY) == INFINITY or len(path) > len(g):
+                return []
+            path.append(cell)
+        return path
+
+class NextHopTable:
+    # All-pairs shortest paths for one small map: for every (from, to) pair of walkable
+    # cells, the first step's direction and the path length, so "next step from A toward B"
+    # is a single array lookup. The row for a target cell is filled by one breadth-first
+    # search the first time that cell is asked for, with each BFS layer found by bit mask
+    # dilation (grid_mask.py). Enemies all chase the player, so rows are only ever built for
+    # cells the player stood on and every enemy shares them. Both arrays hold cells * cells
+    # entries; maps whose arrays would exceed NEXTHOP_MAX_BYTES get no table.
+    def __init__(self, dungeon_map):
+        height, width = len(dungeon_map), len(dungeon_map[0])
+        self.grid = GridMask(width, height)
+        self.walkable = self.grid.full & ~self.grid.from_map(dungeon_map, (CellType.WALL,))
+        self.dungeon_map = dungeon_map
+        self.stride = self.grid.stride
+        self.cell_bits = [y * self.stride + x for x, y in self.grid.cells(self.walkable)]
+        self.index_of = {bit: index for index, bit in enumerate(self.cell_bits)}
+        cells = self.cells = len(self.cell_bits)
+
+        # Distances fit in a byte unless a path can be 255 steps or longer, the top value means unreachable
+        typecode = "B" if cells < 255 else "H"
+        self.unreachable = 255 if typecode == "B" else 65535
+        self.distance = array(typecode, [self.unreachable]) * (cells * cells)  # [to * cells + from]
+        self.hop = array("B", [0]) * (cells * cells)  # index into DIRECTIONS
+        self.built = bytearray(cells)  # Targets whose row is filled in
+        self.rows_built = 0
+
+    def build_row(self, target):
+        grid, walkable, index_of = self.grid, self.walkable, self.index_of
+        distance, hop = self.distance, self.hop
+        row = target * self.cells
+        distance[row + target] = 0
+
+        # Moving the previous layer by -direction marks the cells whose step in direction lands in it
+        toward = [(direction, -dx, -dy) for direction, (dx, dy) in enumerate(DIRECTIONS)]
+        previous = seen = 1 << self.cell_bits[target]
+        steps = 0
+        while previous:
+            steps += 1
+            layer = grid.dilate(previous) & walkable & ~seen
+            seen |= layer
+            remaining = layer
+            for direction, dx, dy in toward:  # First direction in DIRECTIONS order wins ties
+                bucket = remaining & grid.moved(previous, dx, dy)
+                if not bucket:
+                    continue
+                remaining ^= bucket
+                text = bin(bucket)[:1:-1]
+                bit = text.find("1")
+                while bit >= 0:
+                    index = row + index_of[bit]
+                    distance[index] = steps
+                    hop[index] = direction
+                    bit = text.find("1", bit + 1)
+            previous = layer
+
+        self.built[target] = 1
+        self.rows_built += 1
+
+    @staticmethod
+    def table_bytes(dungeon_map): # Upper bound of the memory a table for this map needs
+        cells = sum(cell != CellType.WALL for row in dungeon_map for cell in row)
+        return cells * cells * (2 if cells < 255 else 3)
+
+    def lookup(self, cell): # Table index of a walkable cell, None for walls
+        return self.index_of.get(cell[1] * self.stride + cell[0])
+
+    def target_row(self, goal): # Offset of goal's row, building it on first use, None for walls
+        goal_index = self.lookup(goal)
+        if goal_index is None:
+            return None
+        if not self.built[goal_index]:
+            self.build_row(goal_index)
+        return goal_index * self.cells
+
+    def path_length(self, start, goal): # Steps on a shortest path, None if unreachable
+        start_index, row = self.lookup(start), self.target_row(goal)
+        if start_index is None or row is None:
+            return None
+        steps = self.distance[row + start_index]
+        return None if steps == self.unreachable else steps
+
+    def path(self, start, goal): # Same contract as find_path(start, goal, dungeon_map)
+        start_index, row = self.lookup(start), self.target_row(goal)
+        if start_index is None or row is None:
+            return []
+        if self.distance[row + start_index] == self.unreachable:
+            return []
+
+        path = []
+        x, y = start
+        while (x, y) != goal:
+            dx, dy = DIRECTIONS[self.hop[row + self.index_of[y * self.stride + x]]]
+            x, y = x + dx, y + dy
+            path.append((x, y))
+        return path
+
+# Tables for recently seen maps, shared by every enemy on the map. Entries keep their map
+# alive, so a map object's identity cannot be reused while it is cached.
+next_hop_tables = []
+
+def next_hop_table(dungeon_map): # Cached NextHopTable for dungeon_map, None if it is not a grid or too big
+    for table in next_hop_tables:
+        if table.dungeon_map is dungeon_map:
+            return table
+    if not isinstance(dungeon_map, list) or NextHopTable.table_bytes(dungeon_map) > NEXTHOP_MAX_BYTES:
+        return None
+    table = NextHopTable(dungeon_map)
+    next_hop_tables.insert(0, table)
+    del next_hop_tables[NEXTHOP_CACHE_MAPS:]
+    return table
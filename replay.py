@@ -0,0 +1,214 @@
+import os
+import sys
+import time
+import random
+import struct
+import zlib
+import argparse
+
+import pygame
+
+from constants import *
+
+# Input log layout: a small uncompressed header, then one zlib stream of tick records.
+# Each tick stores the input state the game samples (arrow keys, mouse position, clock,
+# joystick axes) followed by the events handle_events saw. Together with the seed of the
+# global random module that is everything the game logic reads, so feeding the log back
+# reproduces the session tick for tick.
+REPLAY_MAGIC = b"DCRP"
+LOG_HEADER = struct.Struct("<4sHQ")  # magic, version, seed
+TICK = struct.Struct("<BhhIffH")  # flags, mouse x, mouse y, ticks, axis x, axis y, event count
+EVENT = struct.Struct("<Biii")  # kind, three event fields
+
+FLAG_UP = 1
+FLAG_DOWN = 2
+FLAG_LEFT = 4
+FLAG_RIGHT = 8
+FLAG_JOYSTICK = 16
+
+# Event kinds, only the event types and fields handle_events uses are kept
+EVENT_QUIT = 0
+EVENT_KEYDOWN = 1
+EVENT_MOUSEBUTTONDOWN = 2
+EVENT_MOUSEBUTTONUP = 3
+EVENT_MOUSEMOTION = 4
+EVENT_MOUSEWHEEL = 5
+EVENT_JOYAXISMOTION = 6
+EVENT_JOYBUTTONDOWN = 7
+EVENT_JOYHATMOTION = 8
+
+def encode_event(event): # pygame event -> (kind, a, b, c), None for events the game ignores
+    if event.type == pygame.QUIT:
+        return (EVENT_QUIT, 0, 0, 0)
+    if event.type == pygame.KEYDOWN:
+        return (EVENT_KEYDOWN, event.key, 0, 0)
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        return (EVENT_MOUSEBUTTONDOWN, event.button, event.pos[0], event.pos[1])
+    if event.type == pygame.MOUSEBUTTONUP:
+        return (EVENT_MOUSEBUTTONUP, event.button, 0, 0)
+    if event.type == pygame.MOUSEMOTION:
+        return (EVENT_MOUSEMOTION, event.rel[0], event.rel[1], 0)
+    if event.type == pygame.MOUSEWHEEL:
+        return (EVENT_MOUSEWHEEL, event.y, 0, 0)
+    if event.type == pygame.JOYAXISMOTION:
+        return (EVENT_JOYAXISMOTION, event.axis, 0, 0)
+    if event.type == pygame.JOYBUTTONDOWN:
+        return (EVENT_JOYBUTTONDOWN, event.button, 0, 0)
+    if event.type == pygame.JOYHATMOTION:
+        return (EVENT_JOYHATMOTION, event.value[0], event.value[1], 0)
+    return None
+
+def decode_event(kind, a, b, c): # Rebuild a pygame event with the fields handle_events reads
+    if kind == EVENT_QUIT:
+        return pygame.event.Event(pygame.QUIT)
+    if kind == EVENT_KEYDOWN:
+        return pygame.event.Event(pygame.KEYDOWN, key=a)
+    if kind == EVENT_MOUSEBUTTONDOWN:
+        return pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=a, pos=(b, c))
+    if kind == EVENT_MOUSEBUTTONUP:
+        return pygame.event.Event(pygame.MOUSEBUTTONUP, button=a)
+    if kind == EVENT_MOUSEMOTION:
+        return pygame.event.Event(pygame.MOUSEMOTION, rel=(a, b))
+    if kind == EVENT_MOUSEWHEEL:
+        return pygame.event.Event(pygame.MOUSEWHEEL, y=a)
+    if kind == EVENT_JOYAXISMOTION:
+        return pygame.event.Event(pygame.JOYAXISMOTION, axis=a)
+    if kind == EVENT_JOYBUTTONDOWN:
+        return pygame.event.Event(pygame.JOYBUTTONDOWN, button=a)
+    if kind == EVENT_JOYHATMOTION:
+        return pygame.event.Event(pygame.JOYHATMOTION, value=(a, b))
+    raise ValueError(f"Unknown input event kind {kind}")
+
+class InputRecorder: # Streams every tick the game polls into a compressed log file
+    def __init__(self, path, seed):
+        self.file = open(path, "wb")
+        self.file.write(LOG_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed))
+        self.compressor = zlib.compressobj()
+        self.buffer = []
+        self.ticks_recorded = 0
+
+    def record(self, game, events):
+        up, down, left, right = game.arrow_keys
+        flags = (up and FLAG_UP) | (down and FLAG_DOWN) | (left and FLAG_LEFT) | (right and FLAG_RIGHT)
+        axis_x, axis_y = 0.0, 0.0
+        if game.joystick_axes is not None:
+            flags |= FLAG_JOYSTICK
+            axis_x, axis_y = game.joystick_axes
+
+        encoded = [e for e in (encode_event(event) for event in events) if e is not None]
+        self.buffer.append(TICK.pack(flags, game.mouse_pos[0], game.mouse_pos[1], game.ticks,
+                                     axis_x, axis_y, len(encoded)))
+        for e in encoded:
+            self.buffer.append(EVENT.pack(*e))
+
+        self.ticks_recorded += 1
+        if len(self.buffer) >= 1024:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.compressor.compress(b"".join(self.buffer)))
+        self.buffer = []
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.write(self.compressor.flush())
+        self.file.close()
+
+class InputReplay: # Plays a recorded log back as the game's input source
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, self.seed = LOG_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not an input log")
+        if version != REPLAY_VERSION:
+            raise ValueError(f"{path} has log version {version}, expected {REPLAY_VERSION}")
+        self.data = zlib.decompress(data[LOG_HEADER.size:])
+        self.offset = 0
+
+    def finished(self):
+        return self.offset >= len(self.data)
+
+    def next_tick(self, game): # Restore the sampled input state on game and return the tick's events
+        flags, mouse_x, mouse_y, ticks, axis_x, axis_y, count = TICK.unpack_from(self.data, self.offset)
+        self.offset += TICK.size
+
+        game.arrow_keys = (bool(flags & FLAG_UP), bool(flags & FLAG_DOWN),
+                           bool(flags & FLAG_LEFT), bool(flags & FLAG_RIGHT))
+        game.mouse_pos = (mouse_x, mouse_y)
+        game.ticks = ticks
+        game.joystick_axes = (axis_x, axis_y) if flags & FLAG_JOYSTICK else None
+
+        events = []
+        for _ in range(count):
+            events.append(decode_event(*EVENT.unpack_from(self.data, self.offset)))
+            self.offset += EVENT.size
+        return events
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def run_replay(path, draw=True):
+    # Headless, unthrottled run of a recorded session. Returns per-tick
+    # (update_ms, draw_ms) timings; update includes event handling.
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+
+    from game import DungeonCrawlerGame
+
+    replay = InputReplay(path)
+    random.seed(replay.seed)
+    game = DungeonCrawlerGame()
+    game.input_source = replay
+
+    timings = []
+    try:
+        while not replay.finished():
+            start = time.perf_counter()
+            running = game.handle_events()
+            game.update_game()
+            updated = time.perf_counter()
+            if draw:
+                game.draw_frame()
+            drawn = time.perf_counter()
+            timings.append(((updated - start) * 1000, (drawn - updated) * 1000))
+            if not running:
+                break
+    except SystemExit:
+        pass  # The session ended with a quit key, everything before it was replayed
+    return timings
+
+def print_report(timings):
+    if not timings:
+        print("No ticks replayed")
+        return
+    total = sum(update + draw for update, draw in timings)
+    print(f"Replayed {len(timings)} ticks in {total:.1f} ms ({len(timings) / max(total / 1000, 1e-9):.0f} ticks/s)")
+    for label, column in (("update", 0), ("draw", 1), ("frame", None)):
+        values = sorted(t[0] + t[1] if column is None else t[column] for t in timings)
+        print(f"  {label:<6} mean {sum(values) / len(values):.3f} ms  p50 {percentile(values, 0.5):.3f}"
+              f"  p95 {percentile(values, 0.95):.3f}  p99 {percentile(values, 0.99):.3f}  max {values[-1]:.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded input log headless and time every tick")
+    parser.add_argument("log", help="input log written by main.py --record")
+    parser.add_argument("--no-draw", action="store_true", help="skip rendering, time game logic only")
+    parser.add_argument("--csv", help="write per-tick timings to this file")
+    args = parser.parse_args()
+
+    timings = run_replay(args.log, draw=not args.no_draw)
+    print_report(timings)
+
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write("tick,update_ms,draw_ms\n")
+            for tick, (update, draw) in enumerate(timings):
+                f.write(f"{tick},{update:.4f},{draw:.4f}\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import os
+import zlib
+import struct
+
+from constants import *
+from dungeon import DungeonNode, compress_cells, decompress_cells
+from dag_manager import DAGManager
+from entities import Player, Enemy
+
+# Save layout, every number little-endian:
+#   world.bin          magic, version, world token, player, nodes, edges
+#   node_<index>.bin   magic, version, world token, one visited dungeon (map + enemies)
+# The world file is small and rewritten on every save. Dungeon files are only rewritten
+# for nodes visited since the last save, and only read when that dungeon is entered.
+WORLD_MAGIC = b"DCWS"
+NODE_MAGIC = b"DCNS"
+HEADER = struct.Struct("<4sHI")  # magic, version, world token
+PLAYER = struct.Struct("<iiii")  # health, max_health, level, experience
+NODE = struct.Struct("<BBdd")  # difficulty, flags, map position
+NODE_STATS = struct.Struct("<HHH")  # enemies_count, treasures_collected, total_treasures
+EDGE = struct.Struct("<II")
+MAP_SIZE = struct.Struct("<HHI")  # width, height, compressed byte length
+ENEMY = struct.Struct("<HHBiii")  # x, y, level, health, max_health, damage
+
+FLAG_COMPLETED = 1
+FLAG_SAVED_MAP = 2
+
+# What a corrupt file body can raise while it is decoded, turned into SaveError
+DECODE_ERRORS = (zlib.error, UnicodeDecodeError, IndexError, ValueError, KeyError)
+
+class SaveError(Exception):
+    pass
+
+class BinaryWriter:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, layout, *values):
+        self.parts.append(layout.pack(*values))
+
+    def string(self, text):
+        data = text.encode("utf-8")
+        self.parts.append(struct.pack("<H", len(data)))
+        self.parts.append(data)
+
+    def blob(self, data):
+        self.parts.append(data)
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+class BinaryReader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, layout):
+        if self.offset + layout.size > len(self.data):
+            raise SaveError("Save file is truncated")
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def string(self):
+        (length,) = self.unpack(struct.Struct("<H"))
+        return self.blob(length).decode("utf-8")
+
+    def blob(self, length):
+        if self.offset + length > len(self.data):
+            raise SaveError("Save file is truncated")
+        data = self.data[self.offset:self.offset + length]
+        self.offset += length
+        return data
+
+class SaveManager:
+    def __init__(self, directory=SAVE_DIR):
+        self.directory = directory
+        self.world_token = None
+        self.saved_dag = None  # DAGManager the files on disk belong to
+        self.saved_nodes = {}  # node id -> file index, for dungeons on disk but not loaded yet
+        self.node_files = {}  # node id -> file index, for every dungeon written this world
+        self.nodes_written = 0
+
+    def world_path(self):
+        return os.path.join(self.directory, "world.bin")
+
+    def node_path(self, index):
+        return os.path.join(self.directory, f"node_{index}.bin")
+
+    def has_save(self):
+        return os.path.exists(self.world_path())
+
+    def write_file(self, path, data): # Write to a temp file and swap it in, a crash never leaves half a save
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def read_file(self, path, magic):
+        with open(path, "rb") as f:
+            reader = BinaryReader(f.read())
+        file_magic, version, token = reader.unpack(HEADER)
+        if file_magic != magic:
+            raise SaveError(f"{path} is not a save file")
+        if version != SAVE_VERSION:
+            raise SaveError(f"{path} has save version {version}, expected {SAVE_VERSION}")
+        return reader, token
+
+    def save(self, dag_manager, player): # Returns how many dungeon files were rewritten
+        os.makedirs(self.directory, exist_ok=True)
+        if dag_manager is not self.saved_dag:
+            # New world, every visited dungeon has to be written and old files are stale
+            self.world_token = int.from_bytes(os.urandom(4), "little")  # Keeps the game's random stream untouched
+            self.saved_dag = dag_manager
+            self.saved_nodes = {}
+            self.node_files = {}
+            for name in os.listdir(self.directory):
+                if name.startswith("node_"):
+                    os.remove(os.path.join(self.directory, name))
+
+        index_of = {}
+        written = 0
+        for index, (node_id, node) in enumerate(dag_manager.nodes.items()):
+            index_of[node_id] = index
+            if node.packed_map is None and not isinstance(node.dungeon_map, list):
+                continue  # Not visited yet, or a streamed endless map that regenerates from its chunks
+            if node.save_dirty or node_id not in self.node_files:
+                self.write_file(self.node_path(index), self.encode_node(node))
+                self.node_files[node_id] = index
+                node.save_dirty = False
+                written += 1
+
+        self.write_file(self.world_path(), self.encode_world(dag_manager, player, index_of))
+        self.nodes_written += written
+        return written
+
+    def encode_world(self, dag_manager, player, index_of):
+        writer = BinaryWriter()
+        writer.pack(HEADER, WORLD_MAGIC, SAVE_VERSION, self.world_token)
+
+        writer.pack(struct.Struct("<B"), player is not None)
+        if player is not None:
+            writer.pack(PLAYER, player.health, player.max_health, player.level, player.experience)
+
+        writer.pack(struct.Struct("<I"), len(dag_manager.nodes))
+        for node_id, node in dag_manager.nodes.items():
+            flags = 0
+            if node.completed:
+                flags |= FLAG_COMPLETED
+            if node_id in self.node_files or node_id in self.saved_nodes:
+                flags |= FLAG_SAVED_MAP
+            writer.string(node_id)
+            writer.string(node.name)
+            writer.pack(NODE, node.difficulty, flags, node.position[0], node.position[1])
+            writer.pack(NODE_STATS, node.enemies_count, node.treasures_collected, node.total_treasures)
+
+        edges = [(index_of[from_id], index_of[to_id])
+                 for from_id, to_ids in dag_manager.adjacency_list.items() for to_id in to_ids]
+        writer.pack(struct.Struct("<I"), len(edges))
+        for from_index, to_index in edges:
+            writer.pack(EDGE, from_index, to_index)
+        return writer.getvalue()
+
+    def encode_node(self, node):
+        writer = BinaryWriter()
+        writer.pack(HEADER, NODE_MAGIC, SAVE_VERSION, self.world_token)
+
+        if node.packed_map is not None:
+            # Evicted maps are already in the file's compressed form
+            cells = node.packed_map
+            width, height = node.map_size
+        else:
+            dungeon_map = node.dungeon_map
+            cells = compress_cells(cell for row in dungeon_map for cell in row)
+            width, height = len(dungeon_map[0]), len(dungeon_map)
+        writer.pack(MAP_SIZE, width, height, len(cells))
+        writer.blob(cells)
+
+        enemies = [enemy for enemy in node.enemies if enemy.alive]
+        writer.pack(struct.Struct("<H"), len(enemies))
+        for enemy in enemies:
+            writer.string(enemy.type)
+            writer.pack(ENEMY, enemy.x, enemy.y, enemy.level, enemy.health, enemy.max_health, enemy.damage)
+        return writer.getvalue()
+
+    def load(self): # Returns (dag_manager, player), dungeon maps stay on disk until load_node
+        reader, token = self.read_file(self.world_path(), WORLD_MAGIC)
+        try:
+            dag_manager, player, saved_nodes = self.decode_world(reader)
+        except DECODE_ERRORS as e:
+            raise SaveError(f"{self.world_path()} is corrupt: {e}") from e
+
+        self.world_token = token
+        self.saved_dag = dag_manager
+        self.saved_nodes = saved_nodes
+        self.node_files = dict(saved_nodes)
+        return dag_manager, player
+
+    def decode_world(self, reader): # Returns (dag_manager, player, saved node id -> file index)
+        player = None
+        (has_player,) = reader.unpack(struct.Struct("<B"))
+        if has_player:
+            player = Player(0, 0)
+            player.health, player.max_health, player.level, player.experience = reader.unpack(PLAYER)
+
+        dag_manager = DAGManager()
+        node_ids = []
+        saved_nodes = {}
+        (node_count,) = reader.unpack(struct.Struct("<I"))
+        for index in range(node_count):
+            node_id = reader.string()
+            name = reader.string()
+            difficulty, flags, x, y = reader.unpack(NODE)
+            node = DungeonNode(node_id, name, difficulty)
+            node.position = (x, y)
+            node.enemies_count, node.treasures_collected, node.total_treasures = reader.unpack(NODE_STATS)
+            node.completed = bool(flags & FLAG_COMPLETED)
+            if flags & FLAG_SAVED_MAP:
+                saved_nodes[node_id] = index
+            dag_manager.add_node(node)
+            node_ids.append(node_id)
+
+        # Nodes first so add_edge sees the completed flags when counting unmet dependencies
+        (edge_count,) = reader.unpack(struct.Struct("<I"))
+        for _ in range(edge_count):
+            from_index, to_index = reader.unpack(EDGE)
+            from_id, to_id = node_ids[from_index], node_ids[to_index]
+            dag_manager.add_edge(from_id, to_id)
+            dag_manager.nodes[to_id].required_nodes.append(from_id)
+        return dag_manager, player, saved_nodes
+
+    def load_node(self, node): # Deserialize a saved dungeon into node, returns False if there is none
+        index = self.saved_nodes.pop(node.id, None)
+        if index is None:
+            return False
+
+        # A missing, corrupt or stale file is dropped, the dungeon is then generated anew
+        path = self.node_path(index)
+        try:
+            reader, token = self.read_file(path, NODE_MAGIC)
+            if token != self.world_token:
+                raise SaveError(f"{path} belongs to another world")
+            try:
+                node.dungeon_map, node.enemies = self.decode_node(reader)
+            except DECODE_ERRORS as e:
+                raise SaveError(f"{path} is corrupt: {e}") from e
+        except (OSError, SaveError):
+            self.node_files.pop(node.id, None)
+            return False
+        node.save_dirty = False
+        return True
+
+    def decode_node(self, reader): # Returns (dungeon_map, enemies)
+        width, height, length = reader.unpack(MAP_SIZE)
+        cells = decompress_cells(reader.blob(length))
+        if len(cells) != width * height:
+            raise SaveError("Dungeon map size does not match its cells")
+        dungeon_map = [cells[y * width:(y + 1) * width] for y in range(height)]
+
+        enemies = []
+        (enemy_count,) = reader.unpack(struct.Struct("<H"))
+        for _ in range(enemy_count):
+            enemy_type = reader.string()
+            x, y, level, health, max_health, damage = reader.unpack(ENEMY)
+            enemies.append(Enemy(x, y, enemy_type, level, (health, max_health, damage)))
+        return dungeon_map, enemies
@@ -0,0 +1,301 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import deque
+
+from constants import *
+from dungeon import DungeonNode
+from dag_manager import DAGManager
+from entities import Player
+from world_generator import WorldGenerator
+from simulator import SimulatedDungeon, BotPlayer
+
+# Line protocol on a local TCP socket, one JSON object answered per line sent:
+#   new [seed] [tick_rate]   create a session and attach to it
+#   attach <session>         attach to an existing session
+#   move <dx> <dy> | shoot <dx> <dy> | enter <node_id> | leave
+#                            queued, applied at the session's next tick
+#   state                    current session state
+#   stats                    CPU accounting for every session on the host
+#   close                    end the attached session
+
+def build_world(num_nodes): # DAGManager over a generated world, same shape as DungeonCrawlerGame.setup_dag
+    dungeons, dependencies = WorldGenerator(num_nodes, seed=random.getrandbits(32)).generate()
+    dag_manager = DAGManager()
+    for dungeon_id, name, difficulty in dungeons:
+        dag_manager.add_node(DungeonNode(dungeon_id, name, difficulty, dependencies[dungeon_id]))
+        for dep in dependencies[dungeon_id]:
+            dag_manager.add_edge(dep, dungeon_id)
+    return dag_manager
+
+class GameSession:
+    # One headless game: a world, a player and the dungeon being played. Game rules come
+    # from SimulatedDungeon, so a session plays exactly like the balance simulator.
+    # Entities draw from the global random module, so each session keeps its own random
+    # state and swaps it in while it ticks; sessions stay reproducible from their seed
+    # however the host interleaves them.
+    def __init__(self, session_id, seed, tick_rate=FPS, world_nodes=SESSION_WORLD_NODES, bot=False):
+        self.id = session_id
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.bot = BotPlayer() if bot else None
+        self.inputs = deque(maxlen=SESSION_INPUT_QUEUE)  # oldest inputs drop first when flooded
+        self.ticks = 0
+        self.cpu_seconds = 0.0
+        self.started = time.perf_counter()
+        self.closed = False
+
+        host_state = random.getstate()
+        random.seed(seed)
+        self.dag_manager = build_world(world_nodes)
+        self.player = Player(0, 0)
+        self.dungeons = {}  # node id -> SimulatedDungeon, kept between visits
+        self.current_node = None
+        self.dungeon = None
+        self.state = "map"
+        self.random_state = random.getstate()
+        random.setstate(host_state)
+
+    def queue_input(self, command, args):
+        self.inputs.append((command, args))
+
+    def tick(self):
+        host_state = random.getstate()
+        random.setstate(self.random_state)
+        start = time.thread_time()
+
+        while self.inputs:
+            self.apply_input(*self.inputs.popleft())
+        if self.bot is not None:
+            self.bot_input()
+        if self.state == "dungeon":
+            self.update_dungeon()
+        self.ticks += 1
+
+        self.cpu_seconds += time.thread_time() - start
+        self.random_state = random.getstate()
+        random.setstate(host_state)
+
+    def apply_input(self, command, args):
+        if self.state == "map" and command == "enter" and args:
+            node = self.dag_manager.nodes.get(args[0])
+            if node is not None and node.unlocked and not node.completed:
+                self.enter_dungeon(node)
+        elif self.state == "dungeon" and command in ("move", "shoot"):
+            # One cell per input along one axis, like a key press
+            dx, dy = (max(-1, min(1, value)) for value in args)
+            if dx and dy:
+                dy = 0
+            if command == "move" and (dx or dy):
+                self.player.move(dx, dy, self.dungeon.dungeon_map, self.dungeon.enemies)
+            elif command == "shoot" and (dx or dy):
+                self.dungeon.shoot(dx, dy)
+        elif self.state == "dungeon" and command == "leave":
+            self.state = "map"
+            self.dungeon = None
+
+    def bot_input(self):
+        if self.state == "map":
+            frontier = sorted(self.dag_manager.frontier)
+            if frontier:
+                self.enter_dungeon(self.dag_manager.nodes[frontier[0]])
+        elif self.state == "dungeon":
+            self.bot.act(self.dungeon)
+
+    def enter_dungeon(self, node):
+        self.current_node = node
+        self.dungeon = self.dungeons.get(node.id)
+        if self.dungeon is None:
+            self.dungeon = self.dungeons[node.id] = SimulatedDungeon(node.difficulty, self.player)
+        else:
+            # Re-entry: the player still has the coordinates of the last dungeon, start from
+            # the entrance (first empty cell) like DungeonCrawlerGame.enter_dungeon does
+            self.player.x, self.player.y = next((x, y) for y, row in enumerate(self.dungeon.dungeon_map)
+                                                for x, cell in enumerate(row) if cell == CellType.EMPTY)
+        self.state = "dungeon"
+
+    def update_dungeon(self):
+        outcome = self.dungeon.tick()
+        if outcome == "dead":
+            self.state = "game_over"
+        elif outcome == "cleared":
+            self.dag_manager.complete_node(self.current_node.id)
+            del self.dungeons[self.current_node.id]
+            self.dungeon = None
+            self.state = "victory" if self.dag_manager.all_completed() else "map"
+
+    def snapshot(self):
+        player = self.player
+        state = {
+            "session": self.id,
+            "tick": self.ticks,
+            "state": self.state,
+            "player": {"x": player.x, "y": player.y, "health": player.health,
+                       "max_health": player.max_health, "level": player.level},
+            "completed": self.dag_manager.completed_count,
+            "nodes": len(self.dag_manager.nodes),
+        }
+        if self.state == "map":
+            state["frontier"] = sorted(self.dag_manager.frontier)
+        elif self.dungeon is not None:
+            state["node"] = self.current_node.id
+            state["enemies_alive"] = len(self.dungeon.alive_enemies())
+            state["treasures_left"] = len(self.dungeon.treasures)
+        return state
+
+class SessionHost:
+    # Runs every session as its own asyncio task on one event loop, each with its own
+    # tick deadline. Ticks are synchronous and short, so the loop interleaves them and
+    # serves socket clients in between.
+    def __init__(self, world_nodes=SESSION_WORLD_NODES):
+        self.world_nodes = world_nodes
+        self.sessions = {}
+        self.tasks = {}
+        self.next_id = 1
+        self.started = time.perf_counter()
+
+    def create_session(self, seed=None, tick_rate=FPS, bot=False):
+        session_id = self.next_id
+        self.next_id += 1
+        if seed is None:
+            seed = random.getrandbits(32)
+        session = GameSession(session_id, seed, tick_rate, self.world_nodes, bot)
+        self.sessions[session_id] = session
+        self.tasks[session_id] = asyncio.get_running_loop().create_task(self.run_session(session))
+        return session
+
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.closed = True
+            self.tasks.pop(session_id).cancel()
+
+    async def run_session(self, session):
+        loop = asyncio.get_running_loop()
+        period = 1 / session.tick_rate
+        deadline = loop.time()
+        while not session.closed:
+            session.tick()
+            if session.state in ("game_over", "victory") and session.bot is not None:
+                break  # Soak-test bots stop at the end of their run, their stats stay on the host
+            # Fixed rate without bursts: a session that fell behind skips ahead instead of catching up
+            deadline = max(deadline + period, loop.time())
+            await asyncio.sleep(deadline - loop.time())
+
+    def stats(self):
+        wall = time.perf_counter() - self.started
+        sessions = []
+        total_cpu = 0.0
+        for session in self.sessions.values():
+            alive = time.perf_counter() - session.started
+            total_cpu += session.cpu_seconds
+            sessions.append({
+                "session": session.id,
+                "state": session.state,
+                "ticks": session.ticks,
+                "tick_rate": session.tick_rate,
+                "achieved_rate": session.ticks / alive if alive > 0 else 0,
+                "cpu_ms_per_tick": session.cpu_seconds * 1000 / session.ticks if session.ticks else 0,
+                "cpu_share": session.cpu_seconds / alive if alive > 0 else 0,
+            })
+        # Fraction of one core the sessions use together, and how many would fill a core
+        core_share = total_cpu / wall if wall > 0 else 0
+        per_core = len(sessions) / core_share if core_share > 0 else 0
+        return {"sessions": len(sessions), "core_share": core_share, "sessions_per_core": per_core,
+                "per_session": sessions}
+
+    async def handle_client(self, reader, writer):
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("utf-8", "replace").split()
+                if not parts:
+                    continue
+                command, args = parts[0].lower(), parts[1:]
+                try:
+                    reply, session = self.handle_command(session, command, args)
+                except ValueError as e:
+                    reply = {"error": str(e)}
+                writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def handle_command(self, session, command, args): # Returns (reply, attached session)
+        if command == "new":
+            seed = int(args[0]) if args else None
+            tick_rate = float(args[1]) if len(args) > 1 else FPS
+            if tick_rate <= 0:
+                raise ValueError("tick_rate must be positive")
+            session = self.create_session(seed, tick_rate)
+            return {"session": session.id, "seed": session.seed}, session
+        if command == "attach":
+            session = self.sessions.get(int(args[0])) if args else None
+            if session is None:
+                raise ValueError("no such session")
+            return session.snapshot(), session
+        if command == "stats":
+            return self.stats(), session
+        if session is None or session.closed:
+            raise ValueError("not attached to a session, send 'new' or 'attach <id>'")
+        if command in ("move", "shoot"):
+            if len(args) != 2:
+                raise ValueError(f"usage: {command} <dx> <dy>")
+            session.queue_input(command, [int(value) for value in args])  # Parsed here so a tick never fails
+            return {"queued": command, "tick": session.ticks}, session
+        if command in ("enter", "leave"):
+            session.queue_input(command, args)
+            return {"queued": command, "tick": session.ticks}, session
+        if command == "state":
+            return session.snapshot(), session
+        if command == "close":
+            self.close_session(session.id)
+            return {"closed": session.id}, None
+        raise ValueError(f"unknown command {command!r}")
+
+    async def report_loop(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            stats = self.stats()
+            rates = [s["achieved_rate"] for s in stats["per_session"]]
+            mean_rate = sum(rates) / len(rates) if rates else 0
+            print(f"{stats['sessions']} sessions, {stats['core_share'] * 100:.1f}% of a core, "
+                  f"{stats['sessions_per_core']:.0f} sessions/core, mean {mean_rate:.1f} ticks/s")
+
+    async def serve(self, host, port, bots=0, tick_rate=FPS, report_interval=5.0):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        for _ in range(bots):
+            self.create_session(tick_rate=tick_rate, bot=True)
+        print(f"Session host on {host}:{port} with {bots} bot sessions")
+        reporter = asyncio.get_running_loop().create_task(self.report_loop(report_interval))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reporter.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many headless game sessions on one asyncio loop")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=SESSION_HOST_PORT)
+    parser.add_argument("--bots", type=int, default=0, help="start this many bot-driven sessions")
+    parser.add_argument("--rate", type=float, default=FPS, help="tick rate of the bot sessions")
+    parser.add_argument("--world-nodes", type=int, default=SESSION_WORLD_NODES)
+    parser.add_argument("--report", type=float, default=5.0, help="seconds between CPU reports")
+    args = parser.parse_args()
+
+    host = SessionHost(args.world_nodes)
+    try:
+        asyncio.run(host.serve(args.host, args.port, args.bots, args.rate, args.report))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import os
+import time
+import random
+import argparse
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+
+from constants import *
+from dungeon import DungeonGenerator
+from entities import Player, Projectile
+from pathfinding import find_path, manhattan
+
+class SimulatedDungeon:
+    # One dungeon played without a display. tick() follows DungeonCrawlerGame.update_dungeon:
+    # enemies move and attack, projectiles fly, treasure is picked up, the exit completes it.
+    def __init__(self, difficulty, player, enemy_count=None):
+        self.difficulty = difficulty
+        self.dungeon_map, self.total_treasures = DungeonGenerator.generate_dungeon(25, 20, difficulty)
+        self.enemies = DungeonGenerator.place_enemies(self.dungeon_map, difficulty, enemy_count)
+        self.treasures = [(x, y) for y, row in enumerate(self.dungeon_map)
+                          for x, cell in enumerate(row) if cell == CellType.TREASURE]
+        self.exit = next(((x, y) for y, row in enumerate(self.dungeon_map)
+                          for x, cell in enumerate(row) if cell == CellType.EXIT), None)
+        self.treasures_collected = 0
+        self.projectiles = []
+        self.enemy_projectiles = []
+        self.ticks = 0
+        self.damage_taken = 0
+        self.enemies_killed = 0
+
+        # Player starts on the first empty cell, like enter_dungeon
+        self.player = player
+        player.x, player.y = next((x, y) for y, row in enumerate(self.dungeon_map)
+                                  for x, cell in enumerate(row) if cell == CellType.EMPTY)
+
+    def alive_enemies(self):
+        return [enemy for enemy in self.enemies if enemy.alive]
+
+    def shoot(self, direction_x, direction_y):
+        proj_x = self.player.x * 25 + 12.5  # Center of cell
+        proj_y = self.player.y * 25 + 12.5
+        self.projectiles.append(Projectile(proj_x, proj_y, direction_x, direction_y, self.dungeon_map,
+                                           speed=5, is_enemy_projectile=False))
+
+    def tick(self): # Returns "dead", "cleared" or None
+        self.ticks += 1
+        player = self.player
+        health_before = player.health
+
+        for enemy in self.enemies:
+            if enemy.alive:
+                enemy.move_towards_player(player.x, player.y, self.dungeon_map, self.enemies)
+                if enemy.update_attack_timer(player.x, player.y, player, self.dungeon_map, self.enemy_projectiles):
+                    self.damage_taken += health_before - player.health
+                    return "dead"
+
+        enemy_at = {(enemy.x, enemy.y): enemy for enemy in self.enemies if enemy.alive}
+        for projectile in self.projectiles:
+            for cell in projectile.update():
+                enemy = enemy_at.get(cell)
+                if enemy is not None:
+                    projectile.active = False
+                    if enemy.take_damage(PLAYER_PROJECTILE_DAMAGE):
+                        del enemy_at[cell]
+                        self.enemies_killed += 1
+                        player.gain_experience(25)
+                    break
+        self.projectiles = [p for p in self.projectiles if p.active]
+
+        player_cell = (player.x, player.y)
+        for projectile in self.enemy_projectiles:
+            if player_cell in projectile.update():
+                projectile.active = False
+                if player.take_damage(ENEMY_PROJECTILE_DAMAGE):
+                    self.damage_taken += health_before - player.health
+                    return "dead"
+        self.enemy_projectiles = [p for p in self.enemy_projectiles if p.active]
+
+        self.damage_taken += max(0, health_before - player.health)
+
+        cell = self.dungeon_map[player.y][player.x]
+        if cell == CellType.TREASURE:
+            self.dungeon_map[player.y][player.x] = CellType.EMPTY
+            self.treasures.remove((player.x, player.y))
+            self.treasures_collected += 1
+            player.heal(TREASURE_HEAL)
+            player.gain_experience(10)
+
+        if (cell == CellType.EXIT and self.treasures_collected >= self.total_treasures
+                and not self.alive_enemies()):
+            return "cleared"
+        return None
+
+class BotPlayer:
+    # Scripted player: shoots any enemy lined up in a clear row or column, otherwise walks
+    # the game's A* path to the nearest treasure, then the nearest enemy, then the exit.
+    # Acts once every action_interval ticks, roughly a human's key press rate.
+    def __init__(self, action_interval=SIM_BOT_ACTION_INTERVAL, shoot_range=ENEMY_DETECTION_RANGE):
+        self.action_interval = action_interval
+        self.shoot_range = shoot_range
+        self.cooldown = 0
+
+    def clear_line(self, dungeon_map, start, end):
+        dx = (end[0] > start[0]) - (end[0] < start[0])
+        dy = (end[1] > start[1]) - (end[1] < start[1])
+        x, y = start[0] + dx, start[1] + dy
+        while (x, y) != end:
+            if dungeon_map[y][x] == CellType.WALL:
+                return False
+            x, y = x + dx, y + dy
+        return True
+
+    def lined_up_enemy(self, sim):
+        player = (sim.player.x, sim.player.y)
+        best = None
+        for enemy in sim.alive_enemies():
+            if enemy.x != player[0] and enemy.y != player[1]:
+                continue
+            distance = manhattan(player, (enemy.x, enemy.y))
+            if distance <= self.shoot_range and (best is None or distance < best[0]):
+                if self.clear_line(sim.dungeon_map, player, (enemy.x, enemy.y)):
+                    best = (distance, enemy)
+        return best[1] if best else None
+
+    def goal(self, sim):
+        player = (sim.player.x, sim.player.y)
+        if sim.treasures:
+            return min(sim.treasures, key=lambda cell: manhattan(player, cell))
+        enemies = sim.alive_enemies()
+        if enemies:
+            enemy = min(enemies, key=lambda e: manhattan(player, (e.x, e.y)))
+            return (enemy.x, enemy.y)
+        return sim.exit
+
+    def act(self, sim):
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return
+        self.cooldown = self.action_interval
+
+        player = sim.player
+        enemy = self.lined_up_enemy(sim)
+        if enemy is not None:
+            sim.shoot((enemy.x > player.x) - (enemy.x < player.x), (enemy.y > player.y) - (enemy.y < player.y))
+            return
+
+        goal = self.goal(sim)
+        if goal is None:
+            return
+        path = find_path((player.x, player.y), goal, sim.dungeon_map)
+        if path:
+            next_x, next_y = path[0]
+            player.move(next_x - player.x, next_y - player.y, sim.dungeon_map, sim.enemies)
+
+def simulate_dungeon(seed, difficulty, player_level=None, enemy_count=None, max_ticks=SIM_MAX_TICKS):
+    random.seed(seed)  # Dungeon generation and enemy AI draw from the global random module
+
+    player = Player(0, 0)
+    for _ in range((player_level or difficulty) - 1):
+        player.level_up()
+
+    sim = SimulatedDungeon(difficulty, player, enemy_count)
+    bot = BotPlayer()
+    outcome = None
+    while outcome is None and sim.ticks < max_ticks:
+        bot.act(sim)
+        outcome = sim.tick()
+
+    return {
+        "difficulty": difficulty,
+        "won": outcome == "cleared",
+        "timed_out": outcome is None,
+        "ticks": sim.ticks,
+        "damage_taken": sim.damage_taken,
+        "enemies": len(sim.enemies),
+        "enemies_killed": sim.enemies_killed,
+    }
+
+def simulate_batch(task): # Process pool entry point, one task is many dungeons to keep IPC small
+    seeds, difficulty, player_level, enemy_count = task
+    return [simulate_dungeon(seed, difficulty, player_level, enemy_count) for seed in seeds]
+
+class BalanceSimulator:
+    def __init__(self, difficulties=(1, 2, 3, 4, 5), runs=200, workers=None, seed=0,
+                 player_level=None, enemy_count=None, batch_size=25):
+        self.difficulties = difficulties
+        self.runs = runs
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.player_level = player_level
+        self.enemy_count = enemy_count
+        self.batch_size = batch_size
+        self.elapsed = 0
+
+    def tasks(self):
+        # Seeds depend only on (seed, difficulty, run), so results do not change with the worker count
+        for difficulty in self.difficulties:
+            rng = random.Random(f"{self.seed}:{difficulty}")
+            seeds = [rng.getrandbits(32) for _ in range(self.runs)]
+            for start in range(0, len(seeds), self.batch_size):
+                yield (seeds[start:start + self.batch_size], difficulty, self.player_level, self.enemy_count)
+
+    def run(self):
+        start = time.perf_counter()
+        results = []
+        if self.workers == 1:
+            for task in self.tasks():
+                results.extend(simulate_batch(task))
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for batch in pool.map(simulate_batch, self.tasks()):
+                    results.extend(batch)
+        self.elapsed = time.perf_counter() - start
+        return results
+
+    def summarize(self, results): # difficulty -> aggregate stats
+        summary = {}
+        for difficulty in self.difficulties:
+            runs = [r for r in results if r["difficulty"] == difficulty]
+            wins = [r for r in runs if r["won"]]
+            clear_seconds = [r["ticks"] / FPS for r in wins]
+            summary[difficulty] = {
+                "runs": len(runs),
+                "win_rate": len(wins) / len(runs) if runs else 0,
+                "timeouts": sum(r["timed_out"] for r in runs),
+                "clear_mean": statistics.mean(clear_seconds) if clear_seconds else 0,
+                "clear_median": statistics.median(clear_seconds) if clear_seconds else 0,
+                "damage_mean": statistics.mean(r["damage_taken"] for r in runs) if runs else 0,
+                "enemies_mean": statistics.mean(r["enemies"] for r in runs) if runs else 0,
+            }
+        return summary
+
+    def print_report(self, results):
+        print(f"{'diff':>4} {'runs':>6} {'win%':>6} {'timeout':>7} {'clear s':>8} {'median':>7} {'damage':>7} {'enemies':>7}")
+        for difficulty, stats in self.summarize(results).items():
+            print(f"{difficulty:>4} {stats['runs']:>6} {stats['win_rate'] * 100:>5.1f}% {stats['timeouts']:>7} "
+                  f"{stats['clear_mean']:>8.1f} {stats['clear_median']:>7.1f} {stats['damage_mean']:>7.1f} "
+                  f"{stats['enemies_mean']:>7.1f}")
+        print(f"{len(results)} dungeons in {self.elapsed:.2f} s on {self.workers} workers "
+              f"({len(results) / max(self.elapsed, 1e-9):.1f} dungeons/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many dungeons with scripted bots and report balance stats")
+    parser.add_argument("--runs", type=int, default=200, help="dungeons per difficulty")
+    parser.add_argument("--difficulty", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    parser.add_argument("--workers", type=int, help="worker processes, defaults to all cores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--player-level", type=int, help="bot level, defaults to the dungeon difficulty")
+    parser.add_argument("--enemy-count", type=int, help="enemies per dungeon instead of ENEMY_COUNT_BASE + difficulty")
+    args = parser.parse_args()
+
+    simulator = BalanceSimulator(args.difficulty, args.runs, args.workers, args.seed,
+                                 args.player_level, args.enemy_count)
+    results = simulator.run()
+    simulator.print_report(results)
+
+if __name__ == "__main__":
+    main()
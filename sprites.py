@@ -0,0 +1,142 @@
+import math
+import pygame
+
+from constants import *
+
+class SpriteCache:
+    # Entities, projectiles and the small enemy health bars are drawn once into
+    # Surfaces here and reused every frame, so the dungeon view only has to blit.
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.enemy_sprites = {}  # body color -> Surface
+        self.projectile_sprites = {}  # is_enemy_projectile -> Surface
+        self.health_bars = {}  # (width, height, step) -> Surface
+        self.player_sprite = None
+        self.hits = 0
+        self.misses = 0
+
+    def new_surface(self, width, height):
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
+    def enemy(self, color):
+        sprite = self.enemy_sprites.get(color)
+        if sprite is not None:
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        cell_size = self.cell_size
+        sprite = self.new_surface(cell_size, cell_size)
+        center_x = center_y = cell_size // 2
+
+        # Enemy shadow
+        pygame.draw.circle(sprite, (100, 100, 100), (center_x + 2, center_y + 2), cell_size // 3 + 2)
+
+        # Enemy body
+        pygame.draw.circle(sprite, color, (center_x, center_y), cell_size // 3)
+        pygame.draw.circle(sprite, WHITE, (center_x, center_y), cell_size // 3, 2)
+
+        # Enemy eyes
+        pygame.draw.circle(sprite, RED, (center_x - 3, center_y - 2), 2)
+        pygame.draw.circle(sprite, RED, (center_x + 3, center_y - 2), 2)
+
+        self.enemy_sprites[color] = sprite
+        return sprite
+
+    def player(self):
+        if self.player_sprite is not None:
+            self.hits += 1
+            return self.player_sprite
+
+        self.misses += 1
+        cell_size = self.cell_size
+        sprite = self.new_surface(cell_size, cell_size)
+        center_x = center_y = cell_size // 2
+
+        # Player shadow
+        pygame.draw.circle(sprite, (100, 100, 100), (center_x + 2, center_y + 2), cell_size // 3 + 2)
+
+        # Player body
+        pygame.draw.circle(sprite, DARK_BLUE, (center_x, center_y), cell_size // 3)
+        pygame.draw.circle(sprite, LIGHT_BLUE, (center_x, center_y), cell_size // 3 - 2)
+        pygame.draw.circle(sprite, WHITE, (center_x, center_y), cell_size // 3, 2)
+
+        # Player face
+        pygame.draw.circle(sprite, WHITE, (center_x - 2, center_y - 2), 1)
+        pygame.draw.circle(sprite, WHITE, (center_x + 2, center_y - 2), 1)
+        pygame.draw.arc(sprite, WHITE, (center_x - 3, center_y, 6, 4), 0, 3.14, 1)
+
+        self.player_sprite = sprite
+        return sprite
+
+    def projectile(self, is_enemy_projectile): # 11x11 sprite, blit with a (-5, -5) offset from the center
+        sprite = self.projectile_sprites.get(is_enemy_projectile)
+        if sprite is not None:
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = self.new_surface(11, 11)
+        if is_enemy_projectile:
+            # Dark projectile with red glow
+            pygame.draw.circle(sprite, RED, (5, 5), 5)
+            pygame.draw.circle(sprite, DARK_GRAY, (5, 5), 3)
+            pygame.draw.circle(sprite, WHITE, (5, 5), 1)
+        else:
+            # Glow effect
+            pygame.draw.circle(sprite, LIGHT_BLUE, (5, 5), 5)
+            pygame.draw.circle(sprite, DARK_BLUE, (5, 5), 3)
+            pygame.draw.circle(sprite, WHITE, (5, 5), 2)
+
+        self.projectile_sprites[is_enemy_projectile] = sprite
+        return sprite
+
+    def health_bar(self, width, height, current, maximum):
+        # Frames are keyed by the health ratio rounded up to HEALTH_BAR_STEPS, so a
+        # wounded enemy never shows an empty bar. Surface includes the 6px border,
+        # blit it at (x - 6, y - 6) like draw_health_bar_fancy would draw it.
+        ratio = max(0, min(1, current / maximum))
+        step = math.ceil(ratio * HEALTH_BAR_STEPS)
+        key = (width, height, step)
+        bar = self.health_bars.get(key)
+        if bar is not None:
+            self.hits += 1
+            return bar
+
+        self.misses += 1
+        border_thickness = 6
+        radius = height // 2 + border_thickness
+        bar = self.new_surface(width + 2 * border_thickness, height + 2 * border_thickness)
+
+        # Outer border
+        pygame.draw.rect(bar, WHITE, bar.get_rect(), border_radius=radius)
+
+        # Background
+        bg_rect = pygame.Rect(border_thickness, border_thickness, width, height)
+        pygame.draw.rect(bar, DARK_GRAY, bg_rect, border_radius=height // 2)
+
+        # Health bar gradient
+        health_ratio = step / HEALTH_BAR_STEPS
+        health_width = int(width * health_ratio)
+
+        if health_width > 0:
+            if health_ratio > 0.6:
+                color1, color2 = LIGHT_GREEN, DARK_GREEN
+            elif health_ratio > 0.3:
+                color1, color2 = YELLOW, GOLD
+            else:
+                color1, color2 = ORANGE, RED
+
+            for i in range(health_width):
+                ratio = i / width
+                r = int(color1[0] * (1 - ratio) + color2[0] * ratio)
+                g = int(color1[1] * (1 - ratio) + color2[1] * ratio)
+                b = int(color1[2] * (1 - ratio) + color2[2] * ratio)
+                x = border_thickness + i
+                pygame.draw.line(bar, (r, g, b), (x, border_thickness + 2), (x, border_thickness + height - 2))
+
+        self.health_bars[key] = bar
+        return bar
@@ -0,0 +1,33 @@
+import time
+import importlib
+
+class StartupTimer:
+    # Wall-clock breakdown of the way to the first frame. Imports are timed one module
+    # at a time in dependency order, so each row is what that module added on top of
+    # the ones before it.
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.last = self.start
+        self.steps = []  # (label, ms)
+
+    def mark(self, label): # Record the time since the previous mark
+        now = time.perf_counter()
+        self.steps.append((label, (now - self.last) * 1000))
+        self.last = now
+
+    def timed_import(self, name):
+        module = importlib.import_module(name)
+        self.mark(f"import {name}")
+        return module
+
+    def total_ms(self):
+        return (self.last - self.start) * 1000
+
+    def report(self, budget_ms): # Prints the breakdown, returns True if the first frame was within budget
+        print("Startup time breakdown:")
+        for label, ms in self.steps:
+            print(f"  {label:<28} {ms:8.1f} ms")
+        total = self.total_ms()
+        within = total <= budget_ms
+        print(f"  {'time to first frame':<28} {total:8.1f} ms (budget {budget_ms} ms, {'ok' if within else 'OVER BUDGET'})")
+        return within
@@ -0,0 +1,147 @@
+import sys
+import struct
+import argparse
+from array import array
+
+from constants import *
+
+# Per-tick counters. Game code adds to tick_counts directly, an index and an integer add is
+# all it costs, and TelemetryRecorder.end_tick moves the tick's values into the ring
+# buffer (or just clears them while recording is off).
+COUNTERS = ("frame_us", "enemy_paths", "path_expansions", "projectiles", "enemy_projectiles",
+            "enemies_chasing", "enemies_patrolling", "draw_calls", "sprite_cache_hits", "sprite_cache_misses")
+FRAME_US = 0  # update + draw time of the tick
+ENEMY_PATHS = 1  # find_path_to_player calls
+PATH_EXPANSIONS = 2  # nodes expanded by A* and D* Lite
+PROJECTILES = 3
+ENEMY_PROJECTILES = 4
+ENEMIES_CHASING = 5
+ENEMIES_PATROLLING = 6
+DRAW_CALLS = 7  # dungeon view primitives and sprite blits
+SPRITE_CACHE_HITS = 8
+SPRITE_CACHE_MISSES = 9
+
+tick_counts = [0] * len(COUNTERS)
+
+# Binary export: header, counter names, then tick numbers and counter rows, oldest first
+TELEMETRY_MAGIC = b"DCTL"
+HEADER = struct.Struct("<4sHHI")  # magic, version, counter count, row count
+
+class TelemetryRecorder:
+    # Keeps the last capacity ticks in preallocated arrays, one row of counters per tick.
+    # Nothing is allocated while recording, a tick overwrites the oldest row in place.
+    def __init__(self, capacity=TELEMETRY_TICKS, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.width = len(COUNTERS)
+        self.rows = array("I", bytes(4 * capacity * self.width))
+        self.ticks = array("Q", bytes(8 * capacity))
+        self.head = 0  # Next row to write
+        self.count = 0  # Rows holding data
+        self.tick = 0
+        self.totals = [0] * self.width  # Last cumulative value seen by add_total
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def add_total(self, counter, total): # Count the growth of a cumulative counter kept elsewhere
+        tick_counts[counter] += total - self.totals[counter]
+        self.totals[counter] = total
+
+    def end_tick(self):
+        self.tick += 1
+        if self.enabled:
+            base = self.head * self.width
+            rows = self.rows
+            for index, value in enumerate(tick_counts):
+                rows[base + index] = min(value, 0xFFFFFFFF)
+            self.ticks[self.head] = self.tick
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+        for index in range(self.width):
+            tick_counts[index] = 0
+
+    def ordered(self): # (ticks, rows) arrays in recording order
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            ticks = self.ticks[start:start + self.count]
+            rows = self.rows[start * self.width:(start + self.count) * self.width]
+        else:
+            ticks = self.ticks[start:] + self.ticks[:self.head]
+            rows = self.rows[start * self.width:] + self.rows[:self.head * self.width]
+        return ticks, rows
+
+    def export_csv(self, path):
+        ticks, rows = self.ordered()
+        write_csv(path, ticks, rows, self.width)
+
+    def export_binary(self, path):
+        ticks, rows = self.ordered()
+        if sys.byteorder == "big":
+            ticks.byteswap()
+            rows.byteswap()
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, self.width, len(ticks)))
+            for name in COUNTERS:
+                data = name.encode("utf-8")
+                f.write(struct.pack("<B", len(data)) + data)
+            f.write(ticks.tobytes())
+            f.write(rows.tobytes())
+
+    def export(self, path): # CSV for a .csv path, the binary format otherwise
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_binary(path)
+
+def write_csv(path, ticks, rows, width, names=COUNTERS):
+    with open(path, "w") as f:
+        f.write("tick," + ",".join(names) + "\n")
+        for row, tick in enumerate(ticks):
+            f.write(f"{tick}," + ",".join(map(str, rows[row * width:(row + 1) * width])) + "\n")
+
+def read_binary(path): # Returns (names, ticks, rows) from an export_binary file
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, width, count = HEADER.unpack_from(data)
+    if magic != TELEMETRY_MAGIC:
+        raise ValueError(f"{path} is not a telemetry file")
+    if version != TELEMETRY_VERSION:
+        raise ValueError(f"{path} has telemetry version {version}, expected {TELEMETRY_VERSION}")
+
+    offset = HEADER.size
+    names = []
+    for _ in range(width):
+        length = data[offset]
+        names.append(data[offset + 1:offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+    ticks = array("Q", data[offset:offset + 8 * count])
+    offset += 8 * count
+    rows = array("I", data[offset:offset + 4 * count * width])
+    if sys.byteorder == "big":
+        ticks.byteswap()
+        rows.byteswap()
+    return names, ticks, rows
+
+def print_summary(names, ticks, rows):
+    width = len(names)
+    print(f"{len(ticks)} ticks")
+    for index, name in enumerate(names):
+        values = rows[index::width]
+        if values:
+            print(f"  {name:<20} mean {sum(values) / len(values):>10.1f}  max {max(values):>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a binary telemetry file written by main.py --telemetry")
+    parser.add_argument("file")
+    parser.add_argument("--csv", help="also convert it to this CSV file")
+    args = parser.parse_args()
+
+    names, ticks, rows = read_binary(args.file)
+    print_summary(names, ticks, rows)
+    if args.csv:
+        write_csv(args.csv, ticks, rows, len(names), names)
+
+if __name__ == "__main__":
+    main()
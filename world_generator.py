@@ -0,0 +1,123 @@
+import math
+import random
+
+NAME_PREFIXES = [
+    "Dark", "Crystal", "Shadow", "Ice", "Lava", "Ancient", "Sacred", "Mystic", "Lost", "Forbidden",
+    "Goblin", "Orc", "Bandit", "Ruined", "Stone", "Sunken", "Flooded", "Deep", "Forgotten", "Enchanted",
+    "Twisted", "Elder", "Fairy", "Sand", "Mirage", "Scorching", "Hidden", "Cursed", "Silent", "Burning"
+]
+
+NAME_PLACES = [
+    "Cave", "Temple", "Chamber", "Shrine", "Sanctum", "Fortress", "Keep", "Stronghold", "Citadel", "Lake",
+    "Ruins", "Cavern", "Tunnels", "Depths", "Grove", "Forest", "Woods", "Tomb", "Palace", "Dunes",
+    "Crypt", "Catacombs", "Mines", "Vault", "Spire"
+]
+
+BOSS_NAMES = ["Dragon's Lair", "Demon King's Throne", "Ancient Evil", "Dark Lord's Chamber", "Final Boss"]
+
+class WorldGenerator:
+    # Layered random DAG for large campaign worlds. Produces the same (dungeons, dependencies)
+    # shapes as DungeonCrawlerGame.generate_random_dag / generate_random_dependencies:
+    # 'start' -> layer 0 -> ... -> last layer -> 'boss', every edge going one layer down.
+    # Runs in O(V + E): each node draws its parents from a pool of previous-layer nodes that
+    # still have fan-out capacity. max_fan_out is a soft cap, a layer that is wider than
+    # the previous one can feed falls back to parents that are already full.
+    def __init__(self, num_nodes=1000, num_layers=None, min_layer_width=1, max_layer_width=None,
+                 max_fan_in=2, max_fan_out=3, seed=None):
+        if num_nodes < 3:
+            raise ValueError("A world needs at least 3 nodes (start, one dungeon, boss)")
+
+        inner_nodes = num_nodes - 2
+        min_layer_width = max(1, min(min_layer_width, inner_nodes))
+        if num_layers is None:
+            num_layers = max(1, int(math.sqrt(inner_nodes)))
+        num_layers = max(1, min(num_layers, inner_nodes // min_layer_width))
+        if max_layer_width is not None and num_layers * max_layer_width < inner_nodes:
+            raise ValueError(f"{num_layers} layers of at most {max_layer_width} nodes cannot hold {inner_nodes} dungeons")
+
+        self.num_nodes = num_nodes
+        self.num_layers = num_layers
+        self.min_layer_width = min_layer_width
+        self.max_layer_width = max_layer_width
+        self.max_fan_in = max(1, max_fan_in)
+        self.max_fan_out = max(1, max_fan_out)
+        self.rng = random.Random(seed)
+
+    def layer_widths(self):
+        rng = self.rng
+        widths = [self.min_layer_width] * self.num_layers
+        remaining = self.num_nodes - 2 - sum(widths)
+
+        # Hand out the remaining nodes one by one to layers that still have room
+        open_layers = list(range(self.num_layers))
+        while remaining > 0:
+            index = rng.randrange(len(open_layers))
+            layer = open_layers[index]
+            widths[layer] += 1
+            remaining -= 1
+            if self.max_layer_width is not None and widths[layer] >= self.max_layer_width:
+                open_layers[index] = open_layers[-1]
+                open_layers.pop()
+        return widths
+
+    def dungeon_name(self, index): # Unique synthetic name, O(1)
+        prefix = NAME_PREFIXES[index % len(NAME_PREFIXES)]
+        place = NAME_PLACES[(index // len(NAME_PREFIXES)) % len(NAME_PLACES)]
+        cycle = index // (len(NAME_PREFIXES) * len(NAME_PLACES))
+        if cycle:
+            return f"{prefix} {place} {cycle + 1}"
+        return f"{prefix} {place}"
+
+    def pick_parents(self, pool, fan_out):
+        rng = self.rng
+        if not pool:
+            return []
+
+        count = rng.randint(1, min(self.max_fan_in, len(pool)))
+        # Highest index first so swap-removing never moves a slot we still need
+        parents = []
+        for index in sorted(rng.sample(range(len(pool)), count), reverse=True):
+            parent = pool[index]
+            parents.append(parent)
+            fan_out[parent] += 1
+            if fan_out[parent] >= self.max_fan_out:
+                pool[index] = pool[-1]
+                pool.pop()
+        return parents
+
+    def generate(self):
+        rng = self.rng
+        widths = self.layer_widths()
+
+        dungeons = [("start", "Entrance Hall", 1)]
+        dependencies = {"start": []}
+
+        previous_layer = ["start"]
+        index = 1
+        for layer_index, width in enumerate(widths):
+            difficulty = min(5, 1 + (layer_index * 5) // self.num_layers)
+            pool = list(previous_layer)
+            fan_out = dict.fromkeys(previous_layer, 0)
+            layer = []
+
+            for _ in range(width):
+                dungeon_id = f"dungeon_{index}"
+                dungeons.append((dungeon_id, self.dungeon_name(index - 1), difficulty))
+
+                if layer_index == 0:
+                    # The entrance feeds the whole first layer
+                    dependencies[dungeon_id] = ["start"]
+                else:
+                    if not pool:
+                        pool = list(previous_layer)  # Soft fan-out cap, see class comment
+                    dependencies[dungeon_id] = self.pick_parents(pool, fan_out)
+
+                layer.append(dungeon_id)
+                index += 1
+
+            previous_layer = layer
+
+        dungeons.append(("boss", rng.choice(BOSS_NAMES), 5))
+        dependencies["boss"] = rng.sample(previous_layer, min(self.max_fan_in, len(previous_layer)))
+
+        return dungeons, dependencies